@@ -4,6 +4,14 @@ CREATE DATABASE `test_db`;
 USE `test_db`;
 
 -- Drop tables in reverse dependency order
+DROP TABLE IF EXISTS `filter_metadata`;
+DROP TABLE IF EXISTS `rollup_device_brand`;
+DROP TABLE IF EXISTS `rollup_top_transaction`;
+DROP TABLE IF EXISTS `rollup_top_user`;
+DROP TABLE IF EXISTS `rollup_insurance_region`;
+DROP TABLE IF EXISTS `rollup_insurance_period`;
+DROP TABLE IF EXISTS `rollup_transaction_region`;
+DROP TABLE IF EXISTS `rollup_transaction_category`;
 DROP TABLE IF EXISTS `aggregated_user_device`;
 DROP TABLE IF EXISTS `top_user`;
 DROP TABLE IF EXISTS `top_insurance`;
@@ -12,107 +20,455 @@ DROP TABLE IF EXISTS `aggregated_user`;
 DROP TABLE IF EXISTS `aggregated_insurance`;
 DROP TABLE IF EXISTS `aggregated_transaction`;
 DROP TABLE IF EXISTS `map_user_hover`;
+DROP TABLE IF EXISTS `map_insurance_grid_meta`;
+DROP TABLE IF EXISTS `map_insurance_grid`;
 DROP TABLE IF EXISTS `map_insurance_hover`;
 DROP TABLE IF EXISTS `map_transaction_hover`;
+DROP TABLE IF EXISTS `dim_brand`;
+DROP TABLE IF EXISTS `dim_entity`;
+DROP TABLE IF EXISTS `dim_metric_type`;
+DROP TABLE IF EXISTS `dim_instrument_type`;
+DROP TABLE IF EXISTS `dim_category`;
+DROP TABLE IF EXISTS `dim_region`;
+DROP TABLE IF EXISTS `load_pending_period`;
+DROP TABLE IF EXISTS `load_manifest`;
+DROP TABLE IF EXISTS `load_generation`;
 
 -- Create tables
-CREATE TABLE `map_transaction_hover` (
+-- Each fact table has a UNIQUE natural key (the loader upserts on it) and
+-- indexes shaped after the dashboard queries; explain_check.py verifies that
+-- none of those queries needs a full table scan.
+--
+-- The fact tables carry the geography of their source file: `scope` is
+-- 'country' for .../country/india/<year>/ files and 'state' for the
+-- .../state/<name>/<year>/ files, whose state is `parent_state`. They are
+-- LIST-partitioned on scope and HASH-subpartitioned on year, so a query for
+-- one scope and year reads a single subpartition and new years need no DDL.
+-- MySQL requires every PRIMARY/UNIQUE key of a partitioned table to include
+-- the partitioning columns, and partitioned InnoDB tables cannot take part
+-- in foreign keys.
+
+-- Dictionaries for the names repeated on every fact row (regions, categories,
+-- instrument and metric types, top-list entities, device brands). Fact tables
+-- store the small integer id instead of the VARCHAR, which shrinks their rows
+-- and indexes; load_sql.py assigns ids as new values appear.
+CREATE TABLE `dim_region` (
+    `id` SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(100) NOT NULL,
+    UNIQUE KEY `uq_dim_region` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `dim_category` (
+    `id` SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(100) NOT NULL,
+    UNIQUE KEY `uq_dim_category` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `dim_instrument_type` (
+    `id` SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(50) NOT NULL,
+    UNIQUE KEY `uq_dim_instrument_type` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `dim_metric_type` (
+    `id` SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(50) NOT NULL,
+    UNIQUE KEY `uq_dim_metric_type` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- States, districts and pincodes of the top/ files
+CREATE TABLE `dim_entity` (
+    `id` MEDIUMINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(100) NOT NULL,
+    UNIQUE KEY `uq_dim_entity` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `dim_brand` (
+    `id` SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    `value` VARCHAR(100) NOT NULL,
+    UNIQUE KEY `uq_dim_brand` (`value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- One row per loaded source file; fact rows point back at it through file_id
+CREATE TABLE `load_manifest` (
     `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
-    `name` VARCHAR(100),
-    `metric_type` VARCHAR(50),
-    `count` BIGINT,
-    `amount` DOUBLE
+    `path` VARCHAR(255) NOT NULL,
+    `dataset` VARCHAR(100),
+    `size` BIGINT,
+    `mtime` DOUBLE,
+    `content_hash` CHAR(64),
+    `row_count` INT,
+    `loaded_at` TIMESTAMP NULL,
+    UNIQUE KEY `uq_load_manifest_path` (`path`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
-CREATE TABLE `map_insurance_hover` (
+-- Periods of each fact table whose rows changed but whose rollups, data generation and
+-- filter_metadata are not rebuilt yet. Written in the same transaction as the rows and
+-- cleared in the one that bumps load_generation, so an interrupted load is finished by the next run.
+CREATE TABLE `load_pending_period` (
+    `source_table` VARCHAR(64) NOT NULL,
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    PRIMARY KEY (`source_table`, `year`, `quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- One row per load that changed data; the dashboard's query cache keys on the latest id
+CREATE TABLE `load_generation` (
     `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
-    `name` VARCHAR(100),
-    `metric_type` VARCHAR(50),
-    `count` BIGINT,
-    `amount` DOUBLE
+    `loaded_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    `files_loaded` INT,
+    `rows_loaded` BIGINT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+CREATE TABLE `map_transaction_hover` (
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `name_id` SMALLINT UNSIGNED,
+    `metric_type_id` SMALLINT UNSIGNED,
+    `count` BIGINT,
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_map_transaction_hover` (`scope`, `year`, `quarter`, `parent_state`, `name_id`, `metric_type_id`),
+    KEY `idx_map_transaction_hover_year` (`year`, `quarter`, `name_id`, `count`, `amount`),
+    KEY `idx_map_transaction_hover_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
+
+CREATE TABLE `map_insurance_hover` (
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `name_id` SMALLINT UNSIGNED,
+    `metric_type_id` SMALLINT UNSIGNED,
+    `count` BIGINT,
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_map_insurance_hover` (`scope`, `year`, `quarter`, `parent_state`, `name_id`, `metric_type_id`),
+    KEY `idx_map_insurance_hover_year` (`year`, `name_id`, `count`, `amount`),
+    KEY `idx_map_insurance_hover_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
+
+-- Insurance lat/lng grid points (map/insurance/country/india/...). There is no
+-- surrogate id: the primary key starts with the grid cell, so InnoDB stores
+-- the points clustered by period, scope and cell, and the dashboard's
+-- per-cell binning reads one contiguous range.
+CREATE TABLE `map_insurance_grid` (
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` SMALLINT NOT NULL,
+    `quarter` TINYINT NOT NULL,
+    `cell_x` SMALLINT NOT NULL,
+    `cell_y` SMALLINT NOT NULL,
+    `lat` DOUBLE NOT NULL,
+    `lng` DOUBLE NOT NULL,
+    `metric` INT UNSIGNED,
+    `label` VARCHAR(100),
+    PRIMARY KEY (`scope`, `year`, `quarter`, `parent_state`, `cell_y`, `cell_x`, `lat`, `lng`),
+    KEY `idx_map_insurance_grid_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
+
+-- One row per grid file: its level and the metric percentiles PhonePe ships with it
+CREATE TABLE `map_insurance_grid_meta` (
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `data_level` VARCHAR(20),
+    `grid_level` INT,
+    `points` INT,
+    `p10` DOUBLE,
+    `p20` DOUBLE,
+    `p30` DOUBLE,
+    `p40` DOUBLE,
+    `p50` DOUBLE,
+    `p60` DOUBLE,
+    `p80` DOUBLE,
+    `p90` DOUBLE,
+    `p99_5` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_map_insurance_grid_meta` (`scope`, `year`, `quarter`, `parent_state`),
+    KEY `idx_map_insurance_grid_meta_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
+
 CREATE TABLE `map_user_hover` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
-    `name` VARCHAR(100),
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `name_id` SMALLINT UNSIGNED,
     `registered_users` BIGINT,
-    `app_opens` BIGINT
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `app_opens` BIGINT,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_map_user_hover` (`scope`, `year`, `quarter`, `parent_state`, `name_id`),
+    KEY `idx_map_user_hover_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `aggregated_transaction` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `from_ts` BIGINT,
     `to_ts` BIGINT,
-    `category` VARCHAR(100),
-    `instrument_type` VARCHAR(50),
+    `category_id` SMALLINT UNSIGNED,
+    `instrument_type_id` SMALLINT UNSIGNED,
     `count` BIGINT,
-    `amount` DOUBLE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_aggregated_transaction` (`scope`, `year`, `quarter`, `parent_state`, `category_id`, `instrument_type_id`),
+    KEY `idx_aggregated_transaction_year` (`year`, `quarter`, `category_id`, `count`, `amount`),
+    KEY `idx_aggregated_transaction_category` (`category_id`),
+    KEY `idx_aggregated_transaction_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `aggregated_insurance` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `from_ts` BIGINT,
     `to_ts` BIGINT,
-    `category` VARCHAR(100),
-    `instrument_type` VARCHAR(50),
+    `category_id` SMALLINT UNSIGNED,
+    `instrument_type_id` SMALLINT UNSIGNED,
     `count` BIGINT,
-    `amount` DOUBLE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_aggregated_insurance` (`scope`, `year`, `quarter`, `parent_state`, `category_id`, `instrument_type_id`),
+    KEY `idx_aggregated_insurance_year` (`year`, `quarter`, `count`, `amount`),
+    KEY `idx_aggregated_insurance_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `aggregated_user` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `registered_users` BIGINT,
-    `app_opens` BIGINT
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `app_opens` BIGINT,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_aggregated_user` (`scope`, `year`, `quarter`, `parent_state`),
+    KEY `idx_aggregated_user_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
+-- Keyed by the same (scope, year, quarter, parent_state) as its aggregated_user
+-- row rather than by that row's id, so both tables are bulk-loaded in one pass
 CREATE TABLE `aggregated_user_device` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `user_id` INT,
-    `brand` VARCHAR(100),
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `brand_id` SMALLINT UNSIGNED,
     `count` BIGINT,
     `percentage` DOUBLE,
-    FOREIGN KEY (`user_id`) REFERENCES `aggregated_user`(`id`) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_aggregated_user_device` (`scope`, `year`, `quarter`, `parent_state`, `brand_id`),
+    KEY `idx_aggregated_user_device_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `top_transaction` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `entity_level` ENUM('state', 'district', 'pincode'),
-    `entity_name` VARCHAR(100),
-    `metric_type` VARCHAR(20),
+    `entity_name_id` MEDIUMINT UNSIGNED,
+    `metric_type_id` SMALLINT UNSIGNED,
     `count` BIGINT,
-    `amount` DOUBLE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_top_transaction` (`scope`, `year`, `quarter`, `parent_state`, `entity_level`, `entity_name_id`),
+    KEY `idx_top_transaction_level` (`entity_level`, `entity_name_id`, `count`, `amount`),
+    KEY `idx_top_transaction_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `top_insurance` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `entity_level` ENUM('state', 'district', 'pincode'),
-    `entity_name` VARCHAR(100),
-    `metric_type` VARCHAR(20),
+    `entity_name_id` MEDIUMINT UNSIGNED,
+    `metric_type_id` SMALLINT UNSIGNED,
     `count` BIGINT,
-    `amount` DOUBLE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `amount` DOUBLE,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_top_insurance` (`scope`, `year`, `quarter`, `parent_state`, `entity_level`, `entity_name_id`),
+    KEY `idx_top_insurance_level` (`entity_level`, `entity_name_id`, `count`, `amount`),
+    KEY `idx_top_insurance_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
 
 CREATE TABLE `top_user` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
-    `year` INT,
-    `quarter` INT,
+    `id` INT AUTO_INCREMENT,
+    `file_id` INT,
+    `scope` VARCHAR(10) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
     `entity_level` ENUM('state', 'district', 'pincode'),
+    `entity_name_id` MEDIUMINT UNSIGNED,
+    `registered_users` BIGINT,
+    PRIMARY KEY (`id`, `scope`, `year`),
+    UNIQUE KEY `uq_top_user` (`scope`, `year`, `quarter`, `parent_state`, `entity_level`, `entity_name_id`),
+    KEY `idx_top_user_period` (`year`, `quarter`, `entity_level`, `entity_name_id`, `registered_users`),
+    KEY `idx_top_user_file` (`file_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY LIST COLUMNS(`scope`)
+SUBPARTITION BY HASH(`year`) SUBPARTITIONS 8 (
+    PARTITION `p_country` VALUES IN ('country'),
+    PARTITION `p_state` VALUES IN ('state')
+);
+
+-- Summary tables maintained by load_sql.py (refresh_rollups) and read by the dashboard
+CREATE TABLE `rollup_transaction_category` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `category` VARCHAR(100) NOT NULL,
+    `total_count` BIGINT,
+    `total_amount` DOUBLE,
+    PRIMARY KEY (`year`, `quarter`, `category`),
+    KEY `idx_rollup_transaction_category_category` (`category`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_transaction_region` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `name` VARCHAR(100) NOT NULL,
+    `total_count` BIGINT,
+    `total_amount` DOUBLE,
+    PRIMARY KEY (`year`, `quarter`, `name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_insurance_period` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `total_policies` BIGINT,
+    `total_premium` DOUBLE,
+    PRIMARY KEY (`year`, `quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_insurance_region` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `name` VARCHAR(100) NOT NULL,
+    `total_policies` BIGINT,
+    `total_premium` DOUBLE,
+    PRIMARY KEY (`year`, `quarter`, `name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_top_user` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `entity_level` ENUM('state', 'district', 'pincode') NOT NULL,
     `entity_name` VARCHAR(100),
-    `registered_users` BIGINT
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
\ No newline at end of file
+    `total_users` BIGINT,
+    `users_rank` INT NOT NULL,
+    PRIMARY KEY (`year`, `quarter`, `users_rank`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_top_transaction` (
+    `entity_level` ENUM('state', 'district', 'pincode') NOT NULL,
+    `entity_name` VARCHAR(100),
+    `total_count` BIGINT,
+    `total_amount` DOUBLE,
+    `amount_rank` INT NOT NULL,
+    PRIMARY KEY (`entity_level`, `amount_rank`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `rollup_device_brand` (
+    `year` INT NOT NULL,
+    `quarter` INT NOT NULL,
+    `brand` VARCHAR(100) NOT NULL,
+    `total_users` BIGINT,
+    PRIMARY KEY (`year`, `quarter`, `brand`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Widget options and row counts, rewritten by load_sql.py at the end of every load
+-- (refresh_filter_metadata) and read by the dashboard once per data generation
+CREATE TABLE `filter_metadata` (
+    `dataset` VARCHAR(40) NOT NULL,
+    `kind` VARCHAR(20) NOT NULL,
+    `parent_state` VARCHAR(100) NOT NULL DEFAULT '',
+    `value` VARCHAR(100) NOT NULL,
+    `year` SMALLINT NULL,
+    `quarter` TINYINT NULL,
+    `row_count` BIGINT,
+    PRIMARY KEY (`dataset`, `kind`, `parent_state`, `value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
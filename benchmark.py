@@ -0,0 +1,575 @@
+"""Benchmarks for the PhonePe Pulse loader.
+
+Run ``python benchmark.py parse`` to measure how JSON decoding and row
+flattening scale with the number of worker processes, and
+``python benchmark.py memory`` to compare the peak memory of json.load
+against the streaming (``--stream``) parser. No database is needed:
+parsed rows are counted and discarded.
+
+``python benchmark.py frames [SNAPSHOT]`` reads what each dashboard scenario
+reads, from MySQL (``load_sql.DB_CONFIG``) or a snapshot, and compares the
+DataFrame memory before and after ``queries.compact``. It also estimates how
+many bytes per fact row the dictionary-encoded columns save.
+
+``python benchmark.py suite`` is the end-to-end benchmark. For each scale
+(1x, 10x and 100x by default) it generates a synthetic data tree with
+synthetic.py, times every load_sql.py loader into an in-memory DuckDB
+(rows/s and peak RSS, each in a fresh process), builds a DuckDB snapshot, and
+measures p50/p95 latency of every scenario's SQL, of Scenario 3's chart-ready
+query and of every cube interaction.
+Results go to a JSON file, tagged with the git commit, for comparing runs.
+
+``python benchmark.py pack [PACK]`` compares reading the source files one
+by one from the data tree with reading them from a pack.py pack, sequentially
+and memory-mapped. It evicts the files from the page cache before each run
+where the OS allows it.
+
+``python benchmark.py coldstart [SNAPSHOT]`` measures the dashboard's cold
+start. It reports ``-X importtime`` for the modules phonepe_dashboard.py
+imports at start-up and for the ones it defers. It then times each scenario's
+default view in fresh interpreters: in the first session, in a second one,
+and in the first session after serve.py's warm-up.
+"""
+import io
+import ast
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+import argparse
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+import load_sql
+import queries
+import synthetic
+from query_cache import frame_bytes
+
+# (dataset, row extractor) for every loader in load_sql.LOADS
+PARSE_JOBS = [
+    ('top/transaction/country/india', load_sql.top_metric_rows),
+    ('top/insurance/country/india', load_sql.top_metric_rows),
+    ('top/user/country/india', load_sql.top_user_rows),
+    ('aggregated/transaction/country/india', load_sql.aggregated_rows),
+    ('aggregated/user/country/india', load_sql.aggregated_user_rows),
+    ('aggregated/insurance/country/india', load_sql.aggregated_rows),
+    ('map/transaction/hover/country/india', load_sql.hover_rows),
+    ('map/user/hover/country/india', load_sql.user_hover_rows),
+    ('map/insurance/hover/country/india', load_sql.hover_rows),
+    ('map/insurance/country/india', load_sql.grid_rows),
+]
+
+def parse_all(pool, workers=1):
+    rows = 0
+    for base_dir, rows_fn in PARSE_JOBS:
+        for _, file_rows in load_sql.parse_files(list(load_sql.iter_json_files(base_dir)), rows_fn, pool,
+                                                 workers=workers):
+            rows += sum(1 for _ in file_rows)
+    return rows
+
+def bench_parse(worker_counts, repeat=3):
+    results = []
+    for workers in worker_counts:
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            if pool:
+                parse_all(pool, workers)  # warm the workers up before timing
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = parse_all(pool, workers)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        finally:
+            if pool:
+                pool.shutdown()
+        results.append({'workers': workers, 'rows': rows, 'seconds': best, 'rows_per_sec': rows / best})
+    return results
+
+def bench_memory():
+    """Peak Python heap while turning one file into rows, json.load vs. streaming.
+
+    Rows are consumed one at a time, as a writer would, so the peak is what
+    the parser itself holds. Reported per dataset: the peak over all files
+    and the peak on the largest file.
+    """
+    results = []
+    tracemalloc.start()
+    try:
+        for base_dir, rows_fn in PARSE_JOBS:
+            if rows_fn not in load_sql.STREAM_ROWS:
+                continue
+            paths = sorted(load_sql.iter_json_files(base_dir), key=os.path.getsize)
+            for mode, stream in [('json', False), ('stream', True)]:
+                rows, peak = 0, 0
+                start = time.perf_counter()
+                for path in paths:
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                    rows += sum(1 for _ in load_sql.iter_file(path, rows_fn, stream))
+                    file_peak = tracemalloc.get_traced_memory()[1] - base
+                    peak = max(peak, file_peak)
+                largest_peak = file_peak
+                results.append({
+                    'dataset': base_dir, 'mode': mode, 'files': len(paths), 'rows': rows,
+                    'largest_file_bytes': os.path.getsize(paths[-1]),
+                    'peak_bytes': peak, 'largest_file_peak_bytes': largest_peak,
+                    'seconds': time.perf_counter() - start,
+                })
+    finally:
+        tracemalloc.stop()
+    return results
+
+def drop_page_cache(paths):
+    """Ask the kernel to evict ``paths`` from the page cache; False where that is not supported."""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+def read_source(source, parse, pool=None, workers=1):
+    """Files and bytes (and rows, with ``parse``) of every PARSE_JOBS dataset read through ``source``."""
+    files, nbytes, rows = 0, 0, 0
+    for base_dir, rows_fn in PARSE_JOBS:
+        paths = [path for path, _ in source.files(base_dir)]
+        files += len(paths)
+        if parse:
+            for _, file_rows in load_sql.parse_files(paths, rows_fn, pool, source=source, workers=workers):
+                rows += sum(1 for _ in file_rows)
+        else:
+            for path in paths:
+                with source.open(path) as f:
+                    nbytes += len(f.read())
+    return files, nbytes, rows
+
+def bench_pack(pack_path, repeat=3, workers=1):
+    """Reading the data tree file by file vs. the pack, from a cold page cache where possible.
+
+    ``read`` lists and reads every source file; ``load`` also decodes and
+    flattens them into rows, as the loaders do, on ``workers`` processes
+    like ``load_sql.py --workers``. Each timed load starts a fresh pool, so
+    the time includes every worker opening the pack.
+    """
+    import pack
+    if not os.path.exists(os.path.join(pack_path, pack.INDEX)):
+        pack.build_pack(pack_path)
+    tree_files = [path for base_dir, _ in PARSE_JOBS for path in load_sql.iter_json_files(base_dir)]
+    pack_files = [os.path.join(pack_path, name) for name in os.listdir(pack_path)]
+    modes = [
+        ('tree', lambda: load_sql.TREE, tree_files),
+        ('pack sequential', lambda: pack.PackSource(pack_path, 'sequential'), pack_files),
+        ('pack mmap', lambda: pack.PackSource(pack_path, 'mmap'), pack_files),
+    ]
+    results = []
+    for mode, make_source, paths in modes:
+        result = {'mode': mode}
+        for step, parse in [('read', False), ('load', True)]:
+            best = None
+            for _ in range(repeat):
+                cold = drop_page_cache(paths)
+                source = make_source()
+                pool = ProcessPoolExecutor(workers) if parse and workers > 1 else None
+                start = time.perf_counter()
+                try:
+                    files, nbytes, rows = read_source(source, parse, pool, workers)
+                finally:
+                    if pool:
+                        pool.shutdown()
+                elapsed = time.perf_counter() - start
+                if hasattr(source, 'close'):
+                    source.close()
+                best = elapsed if best is None else min(best, elapsed)
+            result.update({'files': files, f'{step}_s': best, 'cold': cold})
+            if parse:
+                result['rows'] = rows
+            else:
+                result['bytes'] = nbytes
+        results.append(result)
+    return results
+
+# The statements behind every dashboard scenario (Scenarios 1-5 read cube.py's
+# cubes; every scenario's filter options come from filter_metadata), with
+# representative parameters
+GRID_PARAMS = {'scope': 'country', 'year': 2023, 'quarter': 3, 'parent_state': ''}
+SCENARIO_READS = {
+    'Scenario 1': [('cube_transaction_category', None), ('cube_transaction_region', None)],
+    'Scenario 2': [('cube_insurance_period', None), ('cube_insurance_region', None)],
+    'Scenario 3': [('cube_transaction_category', None), ('cube_transaction_region', None)],
+    'Scenario 4': [('cube_top_transaction', None)],
+    'Scenario 5': [('cube_top_user', None)],
+    'Scenario 7': [('cube_device_brand', None)],
+    'Scenario 6': [
+        ('grid_bins', dict(GRID_PARAMS, bin_cells=16, max_bins=5000)),
+        ('grid_meta', GRID_PARAMS),
+    ],
+}
+
+# The chart-ready statements the dashboard runs per filter change, with
+# representative parameters
+CHART_READS = {
+    'Scenario 3': [('chart_region_quarters', {'year': 2023})],
+}
+
+def bench_frames(engine):
+    """Bytes of each scenario's DataFrames as pd.read_sql returns them, and compacted."""
+    results = []
+    with engine.connect() as conn:
+        for scenario, reads in SCENARIO_READS.items():
+            rows, before, after = 0, 0, 0
+            for name, params in reads:
+                df = pd.read_sql(queries.statement(name), conn, params=params or {})
+                rows += len(df)
+                before += frame_bytes(df)
+                after += frame_bytes(queries.compact(df))
+            results.append({'scenario': scenario, 'rows': rows, 'before_bytes': before, 'after_bytes': after})
+    return results
+
+def bench_dictionary(engine):
+    """Average bytes per fact row of the encoded columns, stored as VARCHAR vs. as ids.
+
+    VARCHAR is counted as its LENGTH() plus a length byte, ids as the
+    width of their integer column in DB_Creation.sql.
+    """
+    id_bytes = {'dim_entity': 3}  # MEDIUMINT; the other dictionaries use SMALLINT
+    results = []
+    with engine.connect() as conn:
+        for table, columns in load_sql.COLUMNS.items():
+            encoded = [column for column in columns if column in load_sql.DIMENSIONS]
+            if not encoded:
+                continue
+            text_bytes = ' + '.join(
+                f"COALESCE((SELECT LENGTH(value) + 1 FROM {load_sql.DIMENSIONS[column]} d WHERE d.id = t.{column}), 0)"
+                for column in encoded
+            )
+            rows, varchar = conn.exec_driver_sql(f"SELECT COUNT(*), AVG({text_bytes}) FROM {table} t").one()
+            ids = sum(id_bytes.get(load_sql.DIMENSIONS[column], 2) for column in encoded)
+            results.append({'table': table, 'rows': rows, 'varchar_bytes': float(varchar or 0), 'id_bytes': ids})
+    return results
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def in_fresh_process(fn, *args):
+    # Spawned rather than forked, so the peak RSS it reports is this job's alone
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(fn, *args).result()
+
+def time_loader(root, loader, base_dir):
+    """One loader over the tree at ``root``, written to an in-memory DuckDB."""
+    import duckdb
+    import snapshot
+    os.chdir(root)
+    writer, manifest = snapshot.SnapshotWriter(), snapshot.SnapshotManifest()
+    start = time.perf_counter()
+    loader(base_dir, writer, manifest)
+    con = duckdb.connect(':memory:')
+    try:
+        con.execute(snapshot.SCHEMA)
+        writer.write(con)
+    finally:
+        con.close()
+    elapsed = time.perf_counter() - start
+    return {'loader': loader.__name__, 'files': manifest.loaded, 'rows': writer.added, 'seconds': elapsed,
+            'rows_per_sec': writer.added / elapsed if elapsed else 0, 'peak_rss_mb': peak_rss_mb()}
+
+def time_snapshot(root, target):
+    """Every loader plus the rollups, into the DuckDB file ``target``."""
+    import snapshot
+    os.chdir(root)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        snapshot.build_snapshot(target)
+    return {'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()}
+
+def latency(fn, params, runs):
+    """p50/p95 of ``fn`` over ``runs`` calls, cycling through ``params``."""
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(params[i % len(params)])
+        samples.append(time.perf_counter() - start)
+    ms = np.array(samples) * 1000
+    return {'runs': runs, 'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95))}
+
+def scenario_interactions(cubes):
+    """(scenario, fn, params): what each scenario view does with the cubes on a filter change."""
+    category, region = cubes['transaction_category'], cubes['transaction_region']
+    insurance, insurance_region = cubes['insurance_period'], cubes['insurance_region']
+    top_transaction, top_user = cubes['top_transaction'], cubes['top_user']
+    device_brand = cubes['device_brand']
+    years = category.labels['year'].tolist()
+    periods = [tuple(p) for p in top_user.rollup('year', 'quarter').to_frame()[['year', 'quarter']].to_numpy()]
+    device_periods = [tuple(p) for p in device_brand.rollup('year', 'quarter').to_frame()[['year', 'quarter']].to_numpy()]
+
+    def scenario_1(year):
+        categories, states = category.slice(year=year), region.slice(year=year)
+        categories.rollup('quarter', 'category').to_frame()
+        categories.rollup('category').to_frame()
+        states.rollup('quarter', 'state').to_frame()
+        states.top_k('total_amount', 10, 'state')
+
+    def scenario_2(year):
+        insurance.growth('total_premium', 'yoy')
+        states = insurance_region.slice(year=range(year - 2, year + 1))
+        states.rollup('state').to_frame()
+        states.top_k('total_policies', 10, 'state')
+        states.top_k('total_policies', 10, 'state', largest=False)
+
+    def scenario_3(year):
+        category.slice(year=year).to_frame()
+        region.slice(year=year).rollup('quarter', 'state').to_frame()
+
+    def scenario_4(level):
+        top_transaction.slice(entity_level=level).top_k('total_amount', 20, 'entity_name')
+
+    def scenario_5(period):
+        top_user.slice(year=period[0], quarter=period[1]).top_k('total_users', 20, 'entity_level', 'entity_name')
+
+    def scenario_7(period):
+        device_brand.slice(year=period[0], quarter=period[1]).top_k('total_users', len(device_brand.labels['brand']), 'brand')
+
+    return [
+        ('Scenario 1', scenario_1, years),
+        ('Scenario 2', scenario_2, years),
+        ('Scenario 3', scenario_3, years),
+        ('Scenario 4', scenario_4, ['state', 'district', 'pincode']),
+        ('Scenario 5', scenario_5, periods),
+        ('Scenario 7', scenario_7, device_periods),
+    ]
+
+def bench_scenarios(target, runs):
+    import cube
+    from snapshot import create_snapshot_engine
+    engine = create_snapshot_engine(target)
+    results = []
+    with engine.connect() as conn:
+        def read(reads):
+            for name, params in reads:
+                queries.execute(conn, name, params)
+
+        for scenario, reads in SCENARIO_READS.items():
+            results.append(dict(latency(read, [reads], runs), scenario=scenario, path='sql'))
+        for scenario, reads in CHART_READS.items():
+            results.append(dict(latency(read, [reads], runs), scenario=scenario, path='chart'))
+        build = latency(lambda _: cube.build_cubes(lambda name: queries.execute(conn, name)), [None], max(1, runs // 10))
+        cubes = cube.build_cubes(lambda name: queries.execute(conn, name))
+        for scenario, fn, params in scenario_interactions(cubes):
+            results.append(dict(latency(fn, params, runs), scenario=scenario, path='cube'))
+    engine.dispose()
+    return build, results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_suite(scales, work_dir, runs):
+    source = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for scale in scales:
+        root = os.path.join(work_dir, f'x{scale}')
+        start = time.perf_counter()
+        tree = synthetic.generate(root, scale, source)
+        tree['generate_seconds'] = time.perf_counter() - start
+        tree['loaders'] = [in_fresh_process(time_loader, root, loader, base_dir) for loader, base_dir in load_sql.LOADS]
+        target = os.path.join(work_dir, f'x{scale}.duckdb')
+        tree['snapshot'] = in_fresh_process(time_snapshot, root, target)
+        tree['cube_build'], tree['scenarios'] = bench_scenarios(target, runs)
+        results.append(tree)
+    return {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scales': results,
+    }
+
+# Imported inside the dashboard functions that draw charts (see phonepe_dashboard.py)
+DEFERRED_IMPORTS = ['plotly.express', 'plotly.subplots']
+
+def top_level_imports(path):
+    """Modules a script imports at module level, in order."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+def bench_imports(script):
+    """Cumulative ``-X importtime`` ms of each import, after streamlit (the server has loaded it already).
+
+    A module another import already loaded costs nothing when its own turn comes.
+    """
+    startup = [module for module in top_level_imports(script) if module.split('.')[0] != 'streamlit']
+    code = 'import streamlit\n' + ''.join(f'import {module}\n' for module in startup + DEFERRED_IMPORTS)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(script), check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the import that caused them
+        if not name[1:].startswith(' '):
+            cumulative[name.strip()] = int(total_us) / 1000
+    timed = lambda module: cumulative.get(module, 0.0)
+    return ([(module, timed(module)) for module in startup],
+            [(module, timed(module)) for module in DEFERRED_IMPORTS])
+
+def time_sessions(snapshot_path, warm):
+    """Per-scenario ms of two sessions in a fresh interpreter, optionally after serve.warm_up()."""
+    secrets = {'snapshot': {'path': os.path.abspath(snapshot_path)}} if snapshot_path else None
+    code = (
+        "import json, serve\n"
+        f"secrets = {secrets!r}\n"
+        f"warm_up = serve.warm_up(secrets)[0] if {warm!r} else None\n"
+        "first, errors = serve.visit_scenarios(secrets)\n"
+        "second, more = serve.visit_scenarios(secrets)\n"
+        "print(json.dumps({'warm_up_s': warm_up, 'first': first, 'second': second, 'errors': errors + more}))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def default_worker_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    parse = sub.add_parser('parse', help="parse throughput vs. number of worker processes")
+    parse.add_argument('--workers', type=int, nargs='+', default=default_worker_counts())
+    parse.add_argument('--repeat', type=int, default=3)
+    sub.add_parser('memory', help="peak parser memory per file, json.load vs. --stream")
+    pack_parser = sub.add_parser('pack', help="reading the data tree file by file vs. a pack.py pack, from a cold cache")
+    pack_parser.add_argument('pack', nargs='?', default=os.path.join(tempfile.gettempdir(), 'phonepe-benchmark.pack'),
+                             help="pack directory (written first if it does not exist)")
+    pack_parser.add_argument('--repeat', type=int, default=3)
+    pack_parser.add_argument('--workers', type=int, default=1, help="processes used by the load step, as in load_sql.py")
+    frames = sub.add_parser('frames', help="DataFrame memory per dashboard scenario, before and after compacting")
+    frames.add_argument('snapshot', nargs='?', help="a .duckdb file or Parquet directory (default: MySQL)")
+    coldstart = sub.add_parser('coldstart', help="import times and first-session latency, with and without serve.py's warm-up")
+    coldstart.add_argument('snapshot', nargs='?', help="a .duckdb file or Parquet directory (default: .streamlit/secrets.toml)")
+    suite = sub.add_parser('suite', help="synthetic 1x/10x/100x data: loader throughput and scenario latency, as JSON")
+    suite.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    suite.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'phonepe-benchmark'),
+                       help="where the synthetic trees and snapshots are written (and reused)")
+    suite.add_argument('--runs', type=int, default=50, help="timed runs per scenario")
+    suite.add_argument('--output', default='benchmark-results.json')
+    args = parser.parse_args(argv)
+
+    if args.command == 'parse':
+        results = bench_parse(args.workers, args.repeat)
+        baseline = results[0]['seconds']
+        print(f"{'workers':>7} {'rows':>9} {'seconds':>8} {'rows/s':>12} {'speedup':>8}")
+        for r in results:
+            print(f"{r['workers']:>7} {r['rows']:>9,} {r['seconds']:>8.2f} {r['rows_per_sec']:>12,.0f} {baseline / r['seconds']:>7.2f}x")
+
+    elif args.command == 'memory':
+        if load_sql.ijson is None:
+            print("ijson is not installed: --stream falls back to json.load, so both modes match")
+        mb = 1024 * 1024
+        print(f"{'dataset':<38} {'mode':<6} {'rows':>10} {'largest file':>12} {'peak':>9} {'peak (largest)':>14} {'seconds':>8}")
+        for r in bench_memory():
+            print(f"{r['dataset']:<38} {r['mode']:<6} {r['rows']:>10,} {r['largest_file_bytes'] / mb:>10.2f}MB "
+                  f"{r['peak_bytes'] / mb:>7.2f}MB {r['largest_file_peak_bytes'] / mb:>12.2f}MB {r['seconds']:>8.2f}")
+
+    elif args.command == 'pack':
+        results = bench_pack(args.pack, args.repeat, args.workers)
+        mb = 1024 * 1024
+        print(f"load step on {args.workers} worker process{'es' if args.workers > 1 else ''}")
+        print(f"{'source':<16} {'files':>6} {'MB':>7} {'read':>8} {'MB/s':>8} {'load':>8} {'rows/s':>11}")
+        for r in results:
+            print(f"{r['mode']:<16} {r['files']:>6,} {r['bytes'] / mb:>7.1f} {r['read_s']:>7.2f}s "
+                  f"{r['bytes'] / mb / r['read_s']:>8.1f} {r['load_s']:>7.2f}s {r['rows'] / r['load_s']:>11,.0f}")
+        if not results[0]['cold']:
+            print("(the page cache could not be dropped here, so these are warm-cache timings)")
+
+    elif args.command == 'frames':
+        if args.snapshot:
+            from snapshot import create_snapshot_engine
+            engine = create_snapshot_engine(args.snapshot)
+        else:
+            c = load_sql.DB_CONFIG
+            engine = create_engine(f"mysql+pymysql://{c['user']}:{c['password']}@{c['host']}:{c['port']}/{c['database']}")
+        kb = 1024
+        print(f"{'scenario':<11} {'rows':>7} {'before':>10} {'after':>10} {'saved':>6}")
+        for r in bench_frames(engine):
+            saved = 1 - r['after_bytes'] / r['before_bytes'] if r['before_bytes'] else 0
+            print(f"{r['scenario']:<11} {r['rows']:>7,} {r['before_bytes'] / kb:>8.1f}KB {r['after_bytes'] / kb:>8.1f}KB {saved:>6.0%}")
+        print()
+        print(f"{'fact table':<24} {'rows':>10} {'as VARCHAR':>11} {'as ids':>7}  (bytes per row, encoded columns)")
+        for r in bench_dictionary(engine):
+            print(f"{r['table']:<24} {r['rows']:>10,} {r['varchar_bytes']:>11.1f} {r['id_bytes']:>7}")
+
+    elif args.command == 'coldstart':
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phonepe_dashboard.py')
+        startup, deferred = bench_imports(script)
+        print(f"{'import at start-up':<28} {'ms':>8}")
+        for module, ms in startup:
+            print(f"{module:<28} {ms:>8.1f}")
+        print(f"{'total':<28} {sum(ms for _, ms in startup):>8.1f}")
+        print(f"\n{'deferred import':<28} {'ms':>8}")
+        for module, ms in deferred:
+            print(f"{module:<28} {ms:>8.1f}")
+
+        cold, warmed = time_sessions(args.snapshot, False), time_sessions(args.snapshot, True)
+        print(f"\nserve.py warm-up: {warmed['warm_up_s']:.1f}s before the server starts listening")
+        print(f"{'scenario':<12} {'first session':>14} {'second session':>15} {'first after warm-up':>20}")
+        for scenario in cold['first']:
+            print(f"{scenario:<12} {cold['first'][scenario]:>12.0f}ms {cold['second'][scenario]:>13.0f}ms "
+                  f"{warmed['first'].get(scenario, float('nan')):>18.0f}ms")
+        print(f"{'total':<12} {sum(cold['first'].values()):>12.0f}ms {sum(cold['second'].values()):>13.0f}ms "
+              f"{sum(warmed['first'].values()):>18.0f}ms")
+        for error in cold['errors'] + warmed['errors']:
+            print(f"error: {error}")
+
+    elif args.command == 'suite':
+        report = bench_suite(args.scales, os.path.abspath(args.work_dir), args.runs)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        for tree in report['scales']:
+            print(f"\n{tree['scale']}x: {tree['files']:,} files, {tree['bytes'] / 1024 / 1024:,.0f} MB "
+                  f"({tree['time_factor']}x years, {tree['entity_factor']}x districts/pincodes)")
+            print(f"{'loader':<30} {'rows':>11} {'seconds':>8} {'rows/s':>10} {'peak RSS':>9}")
+            for r in tree['loaders']:
+                print(f"{r['loader']:<30} {r['rows']:>11,} {r['seconds']:>8.2f} {r['rows_per_sec']:>10,.0f} {r['peak_rss_mb']:>7.0f}MB")
+            print(f"{'snapshot (all loaders + rollups)':<42} {tree['snapshot']['seconds']:>8.2f} {'':>10} "
+                  f"{tree['snapshot']['peak_rss_mb']:>7.0f}MB")
+            print(f"cube build p50 {tree['cube_build']['p50_ms']:.1f} ms")
+            print(f"{'scenario':<11} {'path':<5} {'p50':>9} {'p95':>9}")
+            for r in tree['scenarios']:
+                print(f"{r['scenario']:<11} {r['path']:<5} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms")
+        print(f"\nresults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Check the chart-ready queries against the cube and pandas path they replace.
+
+Run it against a snapshot with ``python check_charts.py <snapshot>``, or
+against the loaded MySQL database (``load_sql.DB_CONFIG``) with no argument.
+Every ``chart_*`` statement in queries.py is run for every year the data has,
+and its rows are compared with what the same chart computes from the cubes
+with pandas: ``pivot`` for the quarter columns and ``rank(pct=True)`` for the
+percentile, ties included. It exits with status 1 when any of them differ.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+import cube
+import load_sql
+import queries
+
+
+def same(got, expected, columns, order):
+    """Whether two frames hold the same ``columns``, compared after sorting both by ``order``.
+
+    Sorting by the ranked measure and then the names makes the check blind to
+    the order of tied rows only. Numbers are compared with float32 tolerance,
+    since queries.execute narrows floats it can hold exactly.
+    """
+    got = got[columns].sort_values(order, ascending=[False] + [True] * (len(order) - 1)).reset_index(drop=True)
+    expected = expected[columns].sort_values(order, ascending=[False] + [True] * (len(order) - 1)).reset_index(drop=True)
+    if len(got) != len(expected):
+        return False
+    for column in columns:
+        a, b = got[column], expected[column]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            if not np.allclose(a.to_numpy(float), b.to_numpy(float), rtol=1e-6, equal_nan=True):
+                return False
+        elif not (a.astype(str) == b.astype(str)).all():
+            return False
+    return True
+
+def region_quarters(conn, cubes, year):
+    region_df = cubes['transaction_region'].slice(year=year).rollup('quarter', 'state').to_frame()
+    region_df = region_df.rename(columns={'state': 'region'})
+    pivot_df = region_df.pivot(index='region', columns='quarter', values='total_amount').fillna(0)
+    expected = region_df.groupby('region', observed=True)['total_amount'].sum().reset_index()
+    expected['growth_potential'] = expected['total_amount'].rank(pct=True)
+    for quarter in range(1, 5):
+        expected[f'q{quarter}'] = pivot_df[quarter].to_numpy() if quarter in pivot_df else 0.0
+
+    got = queries.execute(conn, 'chart_region_quarters', {'year': year})
+    columns = ['total_amount', 'region', 'growth_potential', 'q1', 'q2', 'q3', 'q4']
+    return same(got, expected, columns, ['total_amount', 'region'])
+
+def checks(cubes):
+    """(statement, filter, check) for every filter value in the data."""
+    years = [int(year) for year in cubes['transaction_region'].labels['year']]
+    return [('chart_region_quarters', year, lambda conn, year=year: region_quarters(conn, cubes, year))
+            for year in years]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from snapshot import create_snapshot_engine
+        engine = create_snapshot_engine(argv[0])
+    else:
+        c = load_sql.DB_CONFIG
+        engine = create_engine(f"mysql+pymysql://{c['user']}:{c['password']}@{c['host']}:{c['port']}/{c['database']}")
+
+    failures = []
+    with engine.connect() as conn:
+        cubes = cube.build_cubes(lambda name: queries.execute(conn, name))
+        results = {}
+        for name, value, check in checks(cubes):
+            passed = check(conn)
+            results.setdefault(name, []).append(passed)
+            if not passed:
+                failures.append(f"{name} ({value})")
+    engine.dispose()
+
+    for name, passed in results.items():
+        status = 'ok' if all(passed) else 'MISMATCH'
+        print(f"{status:<9} {name:<24} {sum(passed)}/{len(passed)} filter values")
+    if failures:
+        print(f"\n{len(failures)} chart queries differ from the cube path: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nEvery chart query returns the rows the cube path computes.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""In-memory OLAP cube over the dashboard's rollup tables.
+
+Every scenario is a slice of the same small space: year x quarter x
+geography or entity x category, with counts, amounts and users as measures.
+``build_cubes`` reads each rollup table once and stores it as dense NumPy
+arrays indexed by integer-coded dimensions, so a filter change is an array
+index and a sum instead of a round trip to the database. The dashboard
+builds the cubes once per data generation and shares them across sessions.
+"""
+import numpy as np
+import pandas as pd
+
+# Cube name -> (dimensions, measures). Each is built from the queries.py
+# statement 'cube_<name>', which selects exactly these columns.
+CUBES = {
+    'transaction_category': (['year', 'quarter', 'category'], ['total_count', 'total_amount']),
+    'transaction_region': (['year', 'quarter', 'state'], ['total_count', 'total_amount']),
+    'insurance_period': (['year', 'quarter'], ['total_policies', 'total_premium']),
+    'insurance_region': (['year', 'quarter', 'state'], ['total_policies', 'total_premium']),
+    'top_user': (['year', 'quarter', 'entity_level', 'entity_name'], ['total_users']),
+    'top_transaction': (['entity_level', 'entity_name'], ['total_count', 'total_amount']),
+    'device_brand': (['year', 'quarter', 'brand'], ['total_users']),
+}
+
+# Periods between a value and the one it is compared with
+GROWTH_LAGS = {'qoq': 1, 'yoy': 4}
+
+
+class Cube:
+    """Dense measure arrays indexed by integer-coded dimensions.
+
+    ``labels[dim]`` holds the sorted labels of each dimension; every measure
+    has one axis per dimension, in ``dims`` order. ``present`` marks the cells
+    that had a source row, so an empty cell is not mistaken for a zero.
+    """
+
+    def __init__(self, dims, labels, measures, present):
+        self.dims = list(dims)
+        self.labels = labels
+        self.measures = measures
+        self.present = present
+
+    @classmethod
+    def from_frame(cls, df, dims, measures):
+        labels, codes = {}, []
+        for dim in dims:
+            inverse, uniques = pd.factorize(df[dim], sort=True)
+            labels[dim] = np.asarray(uniques)
+            codes.append(inverse)
+        shape = tuple(len(labels[dim]) for dim in dims)
+        cells = tuple(codes)
+        arrays = {}
+        for measure in measures:
+            values = df[measure].to_numpy()
+            # Sums are kept in 64 bits, however narrow the source column was read
+            dtype = np.float64 if values.dtype.kind == 'f' else np.int64
+            arrays[measure] = np.zeros(shape, dtype=dtype)
+            np.add.at(arrays[measure], cells, values)
+        present = np.zeros(shape, dtype=bool)
+        present[cells] = True
+        return cls(dims, labels, arrays, present)
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.measures.values()) + self.present.nbytes
+
+    def slice(self, **selection):
+        """Keep only the given labels (one, or any iterable of them) of each named dimension."""
+        index, labels = [], {}
+        for dim in self.dims:
+            codes = np.arange(len(self.labels[dim]))
+            if dim in selection:
+                wanted = selection[dim]
+                wanted = [wanted] if np.isscalar(wanted) else list(wanted)
+                codes = np.flatnonzero(np.isin(self.labels[dim], wanted))
+            index.append(codes)
+            labels[dim] = self.labels[dim][codes]
+        cells = np.ix_(*index)
+        measures = {measure: values[cells] for measure, values in self.measures.items()}
+        return Cube(self.dims, labels, measures, self.present[cells])
+
+    def rollup(self, *dims):
+        """Sum every measure over the dimensions not named, keeping ``dims`` in the order given."""
+        axes = tuple(i for i, dim in enumerate(self.dims) if dim not in dims)
+        kept = [dim for dim in self.dims if dim in dims]
+        order = [kept.index(dim) for dim in dims]
+        measures = {measure: values.sum(axis=axes).transpose(order) for measure, values in self.measures.items()}
+        present = self.present.any(axis=axes).transpose(order)
+        return Cube(dims, {dim: self.labels[dim] for dim in dims}, measures, present)
+
+    def to_frame(self):
+        """One row per present cell, with a column per dimension and per measure.
+
+        Text dimensions come back as ``category`` columns built straight from
+        the cube's codes.
+        """
+        cells = np.nonzero(self.present)
+        data = {}
+        for dim, codes in zip(self.dims, cells):
+            labels = self.labels[dim]
+            if labels.dtype == object:
+                data[dim] = pd.Categorical.from_codes(codes, labels).remove_unused_categories()
+            else:
+                data[dim] = labels[codes]
+        data.update({measure: values[cells] for measure, values in self.measures.items()})
+        return pd.DataFrame(data)
+
+    def top_k(self, measure, k, *dims, largest=True):
+        """The ``k`` largest (or smallest) cells of ``measure`` rolled up to ``dims``."""
+        df = self.rollup(*dims).to_frame()
+        values = df[measure].to_numpy()
+        order = np.argsort(-values if largest else values, kind='stable')[:k]
+        return df.iloc[order].reset_index(drop=True)
+
+    def growth(self, measure, over='qoq', *by):
+        """``measure`` per year, quarter and ``by`` with its growth on the previous quarter or year.
+
+        Growth is NaN where the earlier period is missing or zero.
+        """
+        cube = self.rollup('year', 'quarter', *by)
+        values, present = cube.measures[measure], cube.present
+        years, quarters = cube.labels['year'].astype(int), cube.labels['quarter'].astype(int)
+
+        # Lay the periods out on one axis with a slot for every quarter, so a
+        # lag of one slot is the previous quarter even across gaps
+        first = years.min() if len(years) else 0
+        periods = (years - first)[:, None] * 4 + (quarters - 1)[None, :]
+        slots = (years.max() - first + 1) * 4 if len(years) else 0
+        timeline = np.zeros((slots,) + values.shape[2:])
+        filled = np.zeros((slots,) + values.shape[2:], dtype=bool)
+        timeline[periods] = values
+        filled[periods] = present
+
+        lag = GROWTH_LAGS[over]
+        previous = np.zeros_like(timeline)
+        previous_filled = np.zeros_like(filled)
+        previous[lag:], previous_filled[lag:] = timeline[:-lag], filled[:-lag]
+        comparable = filled & previous_filled & (previous != 0)
+        rate = np.full_like(timeline, np.nan)
+        np.divide(timeline, previous, out=rate, where=comparable)
+        rate -= 1
+
+        df = cube.to_frame()
+        df['growth'] = rate[periods][present]
+        return df
+
+
+def build_cubes(load):
+    """Every cube in CUBES, each from ``load(statement_name)``'s DataFrame."""
+    return {
+        name: Cube.from_frame(load(f'cube_{name}'), dims, measures)
+        for name, (dims, measures) in CUBES.items()
+    }
@@ -0,0 +1,103 @@
+"""EXPLAIN every dashboard query and fail if any of them scans a whole table.
+
+Run it against a loaded database with ``python explain_check.py``. It uses
+the connection settings from ``load_sql.DB_CONFIG`` and exits with status 1
+when MySQL reports an access type of ``ALL`` (full table scan) for any query,
+or when a query that names one scope and one year reads more than one
+partition of a fact table. The ``cube_*`` statements and ``filter_metadata``
+read a small table whole, once per data generation, so their scans are
+reported but allowed, as are scans of a query's own derived tables (its
+CTEs and subqueries, such as grid_bins' per-bin-size counts).
+"""
+import sys
+import mysql.connector
+
+from load_sql import DB_CONFIG, ROLLUPS
+from queries import STATEMENTS, positional
+
+# Representative filter values for every named statement the dashboard runs
+# (queries.STATEMENTS); statements without parameters are checked as they are
+SAMPLE_PARAMS = {
+    'grid_bins': {'scope': 'country', 'year': 2023, 'quarter': 3, 'parent_state': '', 'bin_cells': 16, 'max_bins': 5000},
+    'grid_meta': {'scope': 'country', 'year': 2023, 'quarter': 3, 'parent_state': ''},
+    'chart_region_quarters': {'year': 2023},
+}
+
+DASHBOARD_QUERIES = [
+    (name,) + positional(name, SAMPLE_PARAMS.get(name))
+    for name in STATEMENTS
+]
+
+# The rollup refresh in load_sql.py reads the fact tables one period at a time
+DASHBOARD_QUERIES += [
+    (f'refresh: {rollup}', select, (2023, 3) if per_period else ())
+    for rollup, _, per_period, select in ROLLUPS
+]
+
+# Queries for one scope and one year, which partition pruning must confine to a
+# single (sub)partition of the fact table
+PARTITION_QUERIES = [
+    ('country-level 2023 Q3', """
+        SELECT category_id, SUM(count), SUM(amount)
+        FROM aggregated_transaction
+        WHERE scope = %s AND year = %s AND quarter = %s
+        GROUP BY category_id
+    """, ('country', 2023, 3)),
+    ('state-level 2023 Q3', """
+        SELECT name_id, SUM(count), SUM(amount)
+        FROM map_transaction_hover
+        WHERE scope = %s AND year = %s AND quarter = %s AND parent_state = %s
+        GROUP BY name_id
+    """, ('state', 2023, 3, 'karnataka')),
+]
+PARTITION_QUERIES += [query for query in DASHBOARD_QUERIES if query[0] in ('grid_bins', 'grid_meta')]
+PARTITION_QUERIES += [
+    (f'refresh: {rollup}', select, (2023, 3))
+    for rollup, _, per_period, select in ROLLUPS if per_period
+]
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    return cursor.fetchall()
+
+def main():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor(dictionary=True)
+    failures = []
+    pruning_failures = []
+    try:
+        for name, sql, params in DASHBOARD_QUERIES:
+            for row in explain(cursor, sql, params):
+                derived = (row['table'] or '').startswith('<')  # <derived2>, <union3>: rows the query built itself
+                full_scan = (row['type'] == 'ALL' and not derived
+                             and not name.startswith('cube_') and name != 'filter_metadata')
+                status = 'FULL SCAN' if full_scan else 'full read' if row['type'] == 'ALL' else 'ok'
+                print(f"{status:<9} {name:<28} {row['table'] or '':<24} type={row['type'] or '':<6} key={row['key']}")
+                if full_scan:
+                    failures.append(name)
+        print()
+        # MySQL 8 reports the partitions a query reads in EXPLAIN's `partitions` column
+        # (MySQL 5.7 needs EXPLAIN PARTITIONS)
+        for name, sql, params in PARTITION_QUERIES:
+            for row in explain(cursor, sql, params):
+                if not row.get('partitions'):
+                    continue
+                partitions = row['partitions'].split(',')
+                status = 'ok' if len(partitions) == 1 else 'NOT PRUNED'
+                print(f"{status:<10} {name:<40} {row['table']:<24} partitions={row['partitions']}")
+                if len(partitions) > 1:
+                    pruning_failures.append(name)
+    finally:
+        cursor.close()
+        conn.close()
+    if failures:
+        print(f"\n{len(failures)} dashboard queries fall back to a full table scan: {', '.join(failures)}")
+    if pruning_failures:
+        print(f"\n{len(pruning_failures)} single-scope, single-year queries read more than one partition: "
+              f"{', '.join(pruning_failures)}")
+    if failures or pruning_failures:
+        sys.exit(1)
+    print("\nAll dashboard queries use an index, and single-period queries read one partition.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Payload limits for the dashboard's Plotly charts.
+
+A Plotly figure goes to the browser as a JSON spec that holds every bar,
+cell and point, so a chart's page weight grows with the rows behind it.
+These helpers cap what a chart draws before the figure is built. Categorical
+charts keep their largest ``MAX_CATEGORIES`` labels and merge the rest into
+one "Others" label. Heatmap rows are merged the same way. Box plots only draw
+individual points up to ``MAX_POINTS``, and scatters are thinned to that many
+points. The figures themselves are cached by the dashboard (``plot_cached``),
+keyed by data generation and filter values, together with their payload size.
+"""
+import numpy as np
+import pandas as pd
+
+# Labels a bar, area or heatmap chart draws before the smallest become "Others"
+# (every state and union territory still gets its own)
+MAX_CATEGORIES = 40
+# Points a box plot or scatter draws one by one
+MAX_POINTS = 500
+OTHERS = 'Others'
+
+
+def top_n_with_others(df, label, value, n=MAX_CATEGORIES, by=()):
+    """``df`` with only its ``n`` largest ``label`` values, ranked on the total of ``value``.
+
+    The remaining labels are summed into one ``OTHERS`` row per ``by`` group,
+    over every numeric column. ``df`` is returned unchanged if it has at most
+    ``n`` labels.
+    """
+    totals = df.groupby(label, observed=True)[value].sum()
+    if len(totals) <= n:
+        return df
+    keep = totals.nlargest(n).index
+    kept = df[df[label].isin(keep)]
+    rest = df[~df[label].isin(keep)]
+    if by:
+        others = rest.groupby(list(by), observed=True).sum(numeric_only=True).reset_index()
+    else:
+        others = rest.sum(numeric_only=True).to_frame().T
+    others[label] = OTHERS
+    return pd.concat([kept.astype({label: str}), others[kept.columns]], ignore_index=True)
+
+def box_points(rows):
+    """``points`` for px.box: every point while there are few, else only the outliers."""
+    return 'all' if rows <= MAX_POINTS else 'outliers'
+
+def thin_points(df, order_by, n=MAX_POINTS):
+    """At most ``n`` rows of ``df``, spread evenly along ``order_by`` and always keeping both ends."""
+    if len(df) <= n:
+        return df
+    df = df.sort_values(order_by, kind='stable')
+    return df.iloc[np.unique(np.linspace(0, len(df) - 1, n).round().astype(int))]
+
+def payload_bytes(fig):
+    """Size of the JSON spec ``fig`` sends to the browser."""
+    return len(fig.to_json())
@@ -1,15 +1,93 @@
+import io
 import os
 import json
-import mysql.connector
+import math
+import time
+import argparse
+import hashlib
+import tempfile
+from itertools import repeat
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-conn = mysql.connector.connect(
+try:
+    import ijson  # incremental JSON parser; picks its fastest (C) backend when one is installed
+except ImportError:
+    ijson = None
+
+DB_CONFIG = dict(
     host='localhost',  # Replace with your MySQL host
     user='username',  # Replace with your MySQL username
     port=0000,  # Replace with your MySQL port
     password='your_pass', # Replace with your MySQL password
     database='your_db'  # Replace with your database name
 )
-cursor = conn.cursor()
+
+# Column order of every table the loaders write to (matches DB_Creation.sql).
+# file_id points at the load_manifest row of the source file; scope is
+# 'country' for .../country/india/<year>/ files and 'state' for the
+# .../state/<name>/<year>/ files under them, and parent_state is that state
+# ('' for country-level files). The fact tables are partitioned on scope and year.
+# Repeated names are stored as surrogate keys into the dim_* tables (see DIMENSIONS).
+COLUMNS = {
+    'dim_region': ('value',),
+    'dim_category': ('value',),
+    'dim_instrument_type': ('value',),
+    'dim_metric_type': ('value',),
+    'dim_entity': ('value',),
+    'dim_brand': ('value',),
+    'map_transaction_hover': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'name_id', 'metric_type_id', 'count', 'amount'),
+    'map_user_hover': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'name_id', 'registered_users', 'app_opens'),
+    'map_insurance_hover': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'name_id', 'metric_type_id', 'count', 'amount'),
+    'map_insurance_grid': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'cell_x', 'cell_y', 'lat', 'lng', 'metric', 'label'),
+    'map_insurance_grid_meta': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'data_level', 'grid_level', 'points',
+                                'p10', 'p20', 'p30', 'p40', 'p50', 'p60', 'p80', 'p90', 'p99_5'),
+    'aggregated_transaction': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'from_ts', 'to_ts', 'category_id', 'instrument_type_id', 'count', 'amount'),
+    'aggregated_user': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'registered_users', 'app_opens'),
+    'aggregated_user_device': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'brand_id', 'count', 'percentage'),
+    'aggregated_insurance': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'from_ts', 'to_ts', 'category_id', 'instrument_type_id', 'count', 'amount'),
+    'top_transaction': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'entity_level', 'entity_name_id', 'metric_type_id', 'count', 'amount'),
+    'top_insurance': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'entity_level', 'entity_name_id', 'metric_type_id', 'count', 'amount'),
+    'top_user': ('file_id', 'scope', 'parent_state', 'year', 'quarter', 'entity_level', 'entity_name_id', 'registered_users'),
+}
+
+# Dictionary-encoded column -> the dim_* table holding its values. The row
+# extractors still produce the names; writers swap them for ids (see Dictionary).
+DIMENSIONS = {
+    'name_id': 'dim_region',
+    'category_id': 'dim_category',
+    'instrument_type_id': 'dim_instrument_type',
+    'metric_type_id': 'dim_metric_type',
+    'entity_name_id': 'dim_entity',
+    'brand_id': 'dim_brand',
+}
+
+# Natural keys (the UNIQUE KEYs in DB_Creation.sql); re-inserting one updates the row in place
+NATURAL_KEYS = {
+    'dim_region': ('value',),
+    'dim_category': ('value',),
+    'dim_instrument_type': ('value',),
+    'dim_metric_type': ('value',),
+    'dim_entity': ('value',),
+    'dim_brand': ('value',),
+    'map_transaction_hover': ('scope', 'year', 'quarter', 'parent_state', 'name_id', 'metric_type_id'),
+    'map_user_hover': ('scope', 'year', 'quarter', 'parent_state', 'name_id'),
+    'map_insurance_hover': ('scope', 'year', 'quarter', 'parent_state', 'name_id', 'metric_type_id'),
+    'map_insurance_grid': ('scope', 'year', 'quarter', 'parent_state', 'cell_y', 'cell_x', 'lat', 'lng'),
+    'map_insurance_grid_meta': ('scope', 'year', 'quarter', 'parent_state'),
+    'aggregated_transaction': ('scope', 'year', 'quarter', 'parent_state', 'category_id', 'instrument_type_id'),
+    'aggregated_user': ('scope', 'year', 'quarter', 'parent_state'),
+    'aggregated_user_device': ('scope', 'year', 'quarter', 'parent_state', 'brand_id'),
+    'aggregated_insurance': ('scope', 'year', 'quarter', 'parent_state', 'category_id', 'instrument_type_id'),
+    'top_transaction': ('scope', 'year', 'quarter', 'parent_state', 'entity_level', 'entity_name_id'),
+    'top_insurance': ('scope', 'year', 'quarter', 'parent_state', 'entity_level', 'entity_name_id'),
+    'top_user': ('scope', 'year', 'quarter', 'parent_state', 'entity_level', 'entity_name_id'),
+}
+
+# Grid points are indexed by cell: 1/GRID_CELLS_PER_DEGREE of a degree (~1.1 km) square.
+# The dashboard bins on multiples of this cell, so it never needs the raw points.
+GRID_CELLS_PER_DEGREE = 100
+GRID_PERCENTILES = ('10.0', '20.0', '30.0', '40.0', '50.0', '60.0', '80.0', '90.0', '99.5')
 
 def extract_year_quarter(path):
     parts = path.split(os.sep)
@@ -17,203 +95,809 @@ def extract_year_quarter(path):
     quarter = int(os.path.splitext(parts[-1])[0])
     return year, quarter
 
-# 1. map/transaction/hover
-def load_transaction_hover(base_dir):
+def extract_geography(path):
+    """``(scope, parent_state)`` of a file: ('state', <name>) under .../state/<name>/, else ('country', '')."""
+    parts = path.split(os.sep)
+    if len(parts) >= 4 and parts[-4] == 'state':
+        return 'state', parts[-3].replace('-', ' ')
+    return 'country', ''
+
+def iter_json_files(base_dir):
     for root, _, files in os.walk(base_dir):
         for file in files:
             if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    for item in data['data']['hoverDataList']:
-                        name = item['name']
-                        for metric in item['metric']:
-                            cursor.execute(
-                                "INSERT INTO map_transaction_hover (year, quarter, name, metric_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s)",
-                                (year, quarter, name, metric['type'], metric['count'], metric['amount'])
-                            )
-    conn.commit()
+                yield os.path.join(root, file)
+
+def insert_sql(table, returning_id=False):
+    """Upsert on the table's natural key, so reloading a row never duplicates it."""
+    columns = COLUMNS[table]
+    updates = [f"`{c}` = VALUES(`{c}`)" for c in columns if c not in NATURAL_KEYS[table]]
+    if returning_id:
+        # Make lastrowid point at the existing row when the key already exists
+        updates.insert(0, "`id` = LAST_INSERT_ID(`id`)")
+    return "INSERT INTO {} ({}) VALUES ({}) ON DUPLICATE KEY UPDATE {}".format(
+        table, ', '.join(f"`{c}`" for c in columns), ', '.join(['%s'] * len(columns)), ', '.join(updates)
+    )
+
+
+class Dictionary:
+    """Surrogate keys of the dim_* tables, used to encode rows before they are written.
+
+    ``ids`` starts with the values already stored; a value seen for the first
+    time is stored with ``insert(dim_table, value)``, which returns its new id.
+    """
+
+    def __init__(self, insert, ids=None):
+        self.insert = insert
+        self.ids = {table: {} for table in set(DIMENSIONS.values())}
+        self.ids.update(ids or {})
+        # table -> [(position in the row, dim table)] of its encoded columns
+        self.encoded = {
+            table: [(i, DIMENSIONS[column]) for i, column in enumerate(columns) if column in DIMENSIONS]
+            for table, columns in COLUMNS.items()
+        }
+
+    def encode(self, table, row):
+        encoded = self.encoded[table]
+        if not encoded:
+            return row
+        row = list(row)
+        for i, dim_table in encoded:
+            value = row[i]
+            if value is None:
+                continue
+            ids = self.ids[dim_table]
+            if value not in ids:
+                ids[value] = self.insert(dim_table, value)
+            row[i] = ids[value]
+        return tuple(row)
+
+def mysql_dictionary(cursor):
+    """Dictionary over the dim_* tables in MySQL, inserting new values through ``cursor``."""
+    ids = {}
+    for table in set(DIMENSIONS.values()):
+        cursor.execute(f"SELECT value, id FROM {table}")
+        ids[table] = dict(cursor.fetchall())
+
+    def insert(table, value):
+        cursor.execute(insert_sql(table, returning_id=True), (value,))
+        return cursor.lastrowid
+
+    return Dictionary(insert, ids)
+
+
+# Writers: the loaders hand every row to a writer, which decides how it reaches MySQL.
+# Every writer dictionary-encodes the rows it is given.
+
+class RowWriter:
+    """Row-at-a-time path: one INSERT per row, one commit per loader."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.dictionary = mysql_dictionary(self.cursor)
+        self.rows = {}
+        self.added = 0
+
+    def add(self, table, row):
+        row = self.dictionary.encode(table, row)
+        self.cursor.execute(insert_sql(table), row)
+        self.rows[table] = self.rows.get(table, 0) + 1
+        self.added += 1
+
+    def checkpoint(self):
+        pass
+
+    def finish(self):
+        self.conn.commit()
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+
+class BulkWriter:
+    """Buffers rows per table and flushes them as multi-row INSERTs.
+
+    A flush happens whenever a table's buffer reaches ``chunk_size`` rows.
+    Commits happen at file boundaries once ``chunk_size`` rows are pending,
+    so transactions stay bounded and never end halfway through a file.
+    With ``local_infile`` each chunk is staged to a temporary TSV file and
+    sent with ``LOAD DATA LOCAL INFILE`` instead.
+    """
+
+    def __init__(self, conn, chunk_size=5000, local_infile=False):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.chunk_size = chunk_size
+        self.local_infile = local_infile
+        self.dictionary = mysql_dictionary(self.cursor)
+        self.buffers = {}
+        self.rows = {}
+        self.added = 0
+        self.uncommitted = 0
+
+    def add(self, table, row):
+        self.added += 1
+        buffer = self.buffers.setdefault(table, [])
+        buffer.append(self.dictionary.encode(table, row))
+        if len(buffer) >= self.chunk_size:
+            self.flush(table)
+
+    def flush(self, table):
+        buffer = self.buffers.get(table)
+        if not buffer:
+            return
+        if self.local_infile:
+            self._load_infile(table, buffer)
+        else:
+            # mysql.connector rewrites executemany on an INSERT into one multi-row INSERT
+            self.cursor.executemany(insert_sql(table), buffer)
+        self._count(table, len(buffer))
+        self.buffers[table] = []
+
+    def checkpoint(self):
+        pending = self.uncommitted + sum(len(b) for b in self.buffers.values())
+        if pending >= self.chunk_size:
+            # Flush everything first so a commit never leaves a file half-loaded
+            for table in list(self.buffers):
+                self.flush(table)
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def finish(self):
+        for table in list(self.buffers):
+            self.flush(table)
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+    def _count(self, table, n):
+        self.rows[table] = self.rows.get(table, 0) + n
+        self.uncommitted += n
+
+    def _load_infile(self, table, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8') as f:
+            for row in rows:
+                f.write('\t'.join(tsv_field(v) for v in row) + '\n')
+            staging = f.name
+        try:
+            self.cursor.execute(
+                "LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {} CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({})".format(
+                    table, ', '.join(f"`{c}`" for c in COLUMNS[table])
+                ),
+                (staging,)
+            )
+        finally:
+            os.remove(staging)
+
+def tsv_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+# Row extractors: turn one decoded JSON file into table rows
+
+def hover_item_rows(item, year, quarter):
+    name = item['name']
+    for metric in item['metric']:
+        yield (year, quarter, name, metric['type'], metric['count'], metric['amount'])
+
+def hover_rows(data, year, quarter):
+    for item in data['data']['hoverDataList']:
+        yield from hover_item_rows(item, year, quarter)
+
+def user_hover_rows(data, year, quarter):
+    for name, vals in data['data']['hoverData'].items():
+        yield (year, quarter, name, vals['registeredUsers'], vals['appOpens'])
+
+def aggregated_item_rows(item, year, quarter, from_ts, to_ts):
+    category = item['name']
+    for instrument in item['paymentInstruments']:
+        yield (year, quarter, from_ts, to_ts, category, instrument['type'], instrument['count'], instrument['amount'])
+
+def aggregated_rows(data, year, quarter):
+    from_ts = data['data'].get('from')
+    to_ts = data['data'].get('to')
+    for item in data['data']['transactionData']:
+        yield from aggregated_item_rows(item, year, quarter, from_ts, to_ts)
+
+def top_metric_rows(data, year, quarter):
+    # Ensure 'data' is a dict before using .get()
+    if not isinstance(data.get('data'), dict):
+        return  # Skip files with no data or wrong format
+    for level in ['states', 'districts', 'pincodes']:
+        items = data['data'].get(level, []) or []
+        for item in items:
+            yield (
+                year, quarter,
+                level[:-1], # state, district, pincode
+                item['entityName'],
+                item['metric']['type'],
+                item['metric']['count'],
+                item['metric']['amount']
+            )
+
+def top_user_rows(data, year, quarter):
+    for level in ['states', 'districts', 'pincodes']:
+        items = data['data'].get(level, []) or []
+        for item in items:
+            yield (
+                year, quarter,
+                level[:-1], # state, district, pincode
+                item['name'],
+                item['registeredUsers']
+            )
+
+def aggregated_user_rows(data, year, quarter):
+    agg = data['data']['aggregated']
+    yield 'aggregated_user', (year, quarter, agg['registeredUsers'], agg['appOpens'])
+    for device in data['data'].get('usersByDevice') or []:
+        yield 'aggregated_user_device', (year, quarter, device['brand'], device['count'], device['percentage'])
+
+def grid_cell(lat, lng):
+    return math.floor(lng * GRID_CELLS_PER_DEGREE), math.floor(lat * GRID_CELLS_PER_DEGREE)
+
+def grid_point_row(point, year, quarter):
+    lat, lng, metric, label = point
+    cell_x, cell_y = grid_cell(lat, lng)
+    return (year, quarter, cell_x, cell_y, lat, lng, int(metric), label)
+
+def grid_meta_row(meta, year, quarter, points):
+    percentiles = meta.get('percentiles') or {}
+    return (year, quarter, meta.get('dataLevel'), meta.get('gridLevel'), points) + tuple(
+        percentiles.get(p) for p in GRID_PERCENTILES
+    )
+
+def grid_rows(data, year, quarter):
+    # (table, row) pairs: every point, then the file's meta row with the point count
+    points = data['data']['data']['data']
+    for point in points:
+        yield 'map_insurance_grid', grid_point_row(point, year, quarter)
+    yield 'map_insurance_grid_meta', grid_meta_row(data['data']['meta'], year, quarter, len(points))
+
+
+# Streaming extractors: the same rows, decoded incrementally with ijson so that
+# memory stays flat however large the file is. The small scalars a file's rows
+# need (aggregated from/to, the grid meta) come first in every file, so reading
+# them costs one extra pass over the first buffer only.
+
+def first_value(f, prefix, default=None):
+    f.seek(0)
+    return next(ijson.items(f, prefix, use_float=True), default)
+
+def stream_items(f, prefix):
+    f.seek(0)
+    return ijson.items(f, prefix, use_float=True)
+
+def stream_hover_rows(f, year, quarter):
+    for item in stream_items(f, 'data.hoverDataList.item'):
+        yield from hover_item_rows(item, year, quarter)
+
+def stream_user_hover_rows(f, year, quarter):
+    for name, vals in ijson.kvitems(f, 'data.hoverData', use_float=True):
+        yield (year, quarter, name, vals['registeredUsers'], vals['appOpens'])
+
+def stream_aggregated_rows(f, year, quarter):
+    from_ts = first_value(f, 'data.from')
+    to_ts = first_value(f, 'data.to')
+    for item in stream_items(f, 'data.transactionData.item'):
+        yield from aggregated_item_rows(item, year, quarter, from_ts, to_ts)
+
+def stream_grid_rows(f, year, quarter):
+    meta = first_value(f, 'data.meta', {})
+    points = 0
+    for point in stream_items(f, 'data.data.data.item'):
+        points += 1
+        yield 'map_insurance_grid', grid_point_row(point, year, quarter)
+    yield 'map_insurance_grid_meta', grid_meta_row(meta, year, quarter, points)
+
+# Row extractor -> its streaming counterpart. The top/* and aggregated/user files
+# are a few KB each and always go through json.load.
+STREAM_ROWS = {
+    hover_rows: stream_hover_rows,
+    user_hover_rows: stream_user_hover_rows,
+    aggregated_rows: stream_aggregated_rows,
+    grid_rows: stream_grid_rows,
+}
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# Files each process-pool task parses, and tasks kept in flight per worker.
+# Parsed files wait in memory until the writer takes them, so the window
+# bounds how many of them there can be.
+PARSE_CHUNK = 8
+PARSE_WINDOW = 2
+
+
+class FileTree:
+    """Source files read straight from the ``aggregated/``, ``map/`` and ``top/`` trees.
+
+    The loaders reach their files through a source: ``files(base_dir)``
+    yields ``(path, stat)`` with ``st_size`` and ``st_mtime``, ``digest(path)``
+    is the file's SHA-256 (of ``data``, its bytes, when they are already read),
+    ``read(path)`` returns its bytes and ``open(path)`` returns it as a binary
+    file. pack.PackSource serves the same paths from a packed archive.
+    """
+
+    def files(self, base_dir):
+        for path in iter_json_files(base_dir):
+            yield path, os.stat(path)
+
+    def digest(self, path, data=None):
+        if data is None:
+            return file_hash(path)
+        return hashlib.sha256(data).hexdigest()
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def open(self, path):
+        return open(path, 'rb')
+
+TREE = FileTree()
+
+def iter_rows(f, path, rows_fn, stream=False):
+    """Yield the rows of ``path``, read from the binary file ``f``, decoding incrementally when ``stream`` is set."""
+    year, quarter = extract_year_quarter(path)
+    if stream and ijson is not None and rows_fn in STREAM_ROWS:
+        yield from STREAM_ROWS[rows_fn](f, year, quarter)
+        return
+    yield from rows_fn(json.load(f), year, quarter)
+
+def iter_file(path, rows_fn, stream=False, source=TREE):
+    """Yield the rows of one file, decoding it incrementally when ``stream`` is set."""
+    with source.open(path) as f:
+        yield from iter_rows(f, path, rows_fn, stream)
+
+def parse_file(path, rows_fn, stream=False, source=TREE):
+    """``(digest, rows)`` of one file, read once: its SHA-256 and its rows as a list."""
+    data = source.read(path)
+    return source.digest(path, data), list(iter_rows(io.BytesIO(data), path, rows_fn, stream))
+
+def parse_chunk(paths, rows_fn, stream=False, source=TREE):
+    return [parse_file(path, rows_fn, stream, source) for path in paths]
+
+def parse_files(paths, rows_fn, pool=None, stream=False, source=TREE, workers=1):
+    """Yield ``(digest, rows)`` for every file in ``paths``, in order.
+
+    Serially each file's rows are a generator, so with ``stream`` rows reach
+    the writer while the file is still being decoded, and the digest is None
+    (the caller hashes the file if it needs to). With a process ``pool`` the
+    reading, hashing, decoding and flattening run in the workers, and each
+    file comes back with its digest and its rows as a list. Only
+    ``PARSE_WINDOW`` chunks per worker (``workers``, the pool's size) are in
+    flight at once: a chunk is submitted when the writer has taken an earlier
+    one, so a slow writer holds back the parsing instead of letting parsed
+    files pile up.
+    """
+    if pool is None:
+        yield from zip(repeat(None), map(iter_file, paths, repeat(rows_fn), repeat(stream), repeat(source)))
+        return
+    window = PARSE_WINDOW * workers
+    pending = deque()
+    for i in range(0, len(paths), PARSE_CHUNK):
+        if len(pending) >= window:
+            yield from pending.popleft().result()
+        pending.append(pool.submit(parse_chunk, paths[i:i + PARSE_CHUNK], rows_fn, stream, source))
+    while pending:
+        yield from pending.popleft().result()
+
+
+class Manifest:
+    """Source files already loaded, as recorded in the ``load_manifest`` table.
+
+    Only new or changed files are handed to the loaders. Size and mtime are
+    compared first, so unchanged files are not even read; a file whose
+    mtime moved but whose size did not is hashed and skipped if its content
+    is the same. New files and files of a new size are hashed as they are
+    parsed, not in a separate pass. Files
+    come from ``source`` (the data tree, or a pack.PackSource), which keeps
+    the same paths either way.
+    """
+
+    def __init__(self, conn, force=False, source=TREE):
+        self.force = force
+        self.source = source
+        self.skipped = 0
+        self.loaded = 0
+        self.touched = {}  # table -> {(year, quarter)} loaded in this run
+        cursor = conn.cursor()
+        cursor.execute("SELECT path, id, size, mtime, content_hash FROM load_manifest")
+        self.entries = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+        cursor.close()
+
+    def changed_files(self, base_dir, writer):
+        """``(path, stat, digest)`` of every file to load; ``digest`` is None when it is not known yet."""
+        changed = []
+        for path, stat in self.source.files(base_dir):
+            entry = self.entries.get(path)
+            digest = None
+            if entry and not self.force:
+                file_id, size, mtime, content_hash = entry
+                if size == stat.st_size:
+                    if mtime == stat.st_mtime:
+                        self.skipped += 1
+                        continue
+                    digest = self.source.digest(path)
+                    if digest == content_hash:
+                        # Touched but not modified: remember the new mtime and move on
+                        writer.cursor.execute("UPDATE load_manifest SET mtime = %s WHERE id = %s", (stat.st_mtime, file_id))
+                        entry[2] = stat.st_mtime
+                        self.skipped += 1
+                        continue
+            changed.append((path, stat, digest))
+        return changed
+
+    def begin(self, writer, path, dataset, tables):
+        """Return the file_id for ``path``, deleting the rows its previous version produced.
+
+        The file's period is also recorded in ``load_pending_period``, in the
+        same transaction as its rows, the first time this run meets it.
+        """
+        period = extract_year_quarter(path)
+        for table in tables:
+            periods = self.touched.setdefault(table, set())
+            if period not in periods:
+                periods.add(period)
+                writer.cursor.execute("INSERT IGNORE INTO load_pending_period (source_table, year, quarter) "
+                                      "VALUES (%s, %s, %s)", (table,) + period)
+        entry = self.entries.get(path)
+        if entry is None:
+            writer.cursor.execute("INSERT INTO load_manifest (path, dataset) VALUES (%s, %s)", (path, dataset))
+            return writer.cursor.lastrowid
+        scope, _ = extract_geography(path)
+        year, _ = extract_year_quarter(path)
+        for table in tables:
+            if 'scope' in COLUMNS[table]:
+                # Naming the partition columns confines the delete to the file's own partition
+                writer.cursor.execute(f"DELETE FROM {table} WHERE scope = %s AND year = %s AND file_id = %s",
+                                      (scope, year, entry[0]))
+            else:
+                writer.cursor.execute(f"DELETE FROM {table} WHERE file_id = %s", (entry[0],))
+        return entry[0]
+
+    def record(self, writer, path, file_id, stat, digest, row_count):
+        writer.cursor.execute(
+            "UPDATE load_manifest SET size = %s, mtime = %s, content_hash = %s, row_count = %s, "
+            "loaded_at = CURRENT_TIMESTAMP WHERE id = %s",
+            (stat.st_size, stat.st_mtime, digest, row_count, file_id)
+        )
+        self.entries[path] = [file_id, stat.st_size, stat.st_mtime, digest]
+        self.loaded += 1
+
+def load_changed(base_dir, tables, rows_fn, writer, manifest, pool=None, stream=False, workers=1):
+    """Yield ``(file_id, (scope, parent_state), rows)`` for every new or changed file under ``base_dir``.
+
+    The old rows of a changed file are deleted before its new rows are
+    yielded, and the manifest is updated once the caller has added them;
+    the writer only commits at file boundaries, so both happen in one
+    transaction.
+    """
+    changed = manifest.changed_files(base_dir, writer)
+    parsed = parse_files([path for path, _, _ in changed], rows_fn, pool, stream, manifest.source, workers)
+    for (path, stat, digest), (parsed_digest, rows) in zip(changed, parsed):
+        file_id = manifest.begin(writer, path, base_dir, tables)
+        before = writer.added
+        yield file_id, extract_geography(path), rows
+        digest = digest or parsed_digest or manifest.source.digest(path)
+        manifest.record(writer, path, file_id, stat, digest, writer.added - before)
+        writer.checkpoint()
+    writer.finish()
+
+def load_files(base_dir, table, rows_fn, writer, manifest, pool=None, stream=False, workers=1):
+    for file_id, geography, rows in load_changed(base_dir, [table], rows_fn, writer, manifest, pool, stream, workers):
+        for row in rows:
+            writer.add(table, (file_id,) + geography + row)
+
+# 1. map/transaction/hover
+def load_transaction_hover(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'map_transaction_hover', hover_rows, writer, manifest, pool, stream, workers)
 
 # 2. map/user/hover
-def load_user_hover(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    for name, vals in data['data']['hoverData'].items():
-                        cursor.execute(
-                            "INSERT INTO map_user_hover (year, quarter, name, registered_users, app_opens) VALUES (%s, %s, %s, %s, %s)",
-                            (year, quarter, name, vals['registeredUsers'], vals['appOpens'])
-                        )
-    conn.commit()
+def load_user_hover(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'map_user_hover', user_hover_rows, writer, manifest, pool, stream, workers)
+
 # 3. map/insurance/hover
-def load_insurance_hover(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    for item in data['data']['hoverDataList']:
-                        name = item['name']
-                        for metric in item['metric']:
-                            cursor.execute(
-                                "INSERT INTO map_insurance_hover (year, quarter, name, metric_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s)",
-                                (year, quarter, name, metric['type'], metric['count'], metric['amount'])
-                            )
-    conn.commit()
+def load_insurance_hover(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'map_insurance_hover', hover_rows, writer, manifest, pool, stream, workers)
+
+# 4. map/insurance lat/lng grid
+def load_insurance_grid(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    tables = ['map_insurance_grid', 'map_insurance_grid_meta']
+    for file_id, geography, rows in load_changed(base_dir, tables, grid_rows, writer, manifest, pool, stream, workers):
+        for table, row in rows:
+            writer.add(table, (file_id,) + geography + row)
 
 # 1. aggregated/transaction
-def load_aggregated_transaction(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    from_ts = data['data'].get('from')
-                    to_ts = data['data'].get('to')
-                    for item in data['data']['transactionData']:
-                        category = item['name']
-                        for instrument in item['paymentInstruments']:
-                            cursor.execute(
-                                "INSERT INTO aggregated_transaction (year, quarter, from_ts, to_ts, category, instrument_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-                                (year, quarter, from_ts, to_ts, category, instrument['type'], instrument['count'], instrument['amount'])
-                            )
-    conn.commit()
+def load_aggregated_transaction(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'aggregated_transaction', aggregated_rows, writer, manifest, pool, stream, workers)
 
 # 2. aggregated/user
-def load_aggregated_user(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    agg = data['data']['aggregated']
-                    cursor.execute(
-                        "INSERT INTO aggregated_user (year, quarter, registered_users, app_opens) VALUES (%s, %s, %s, %s)",
-                        (year, quarter, agg['registeredUsers'], agg['appOpens'])
-                    )
-                    user_id = cursor.lastrowid
-                    users_by_device = data['data'].get('usersByDevice')
-                    if users_by_device:
-                        for device in data['data']['usersByDevice']:
-                            cursor.execute(
-                                "INSERT INTO aggregated_user_device (user_id, brand, count, percentage) VALUES (%s, %s, %s, %s)",
-                                (user_id, device['brand'], device['count'], device['percentage'])
-                            )
-    conn.commit()
+def load_aggregated_user(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    tables = ['aggregated_user_device', 'aggregated_user']
+    for file_id, geography, rows in load_changed(base_dir, tables, aggregated_user_rows, writer, manifest, pool, stream, workers):
+        # Device rows carry the file's own (scope, year, quarter, parent_state) key,
+        # so both tables are buffered and bulk-written like any other
+        for table, row in rows:
+            writer.add(table, (file_id,) + geography + row)
 
 # 3. aggregated/insurance
-def load_aggregated_insurance(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    from_ts = data['data'].get('from')
-                    to_ts = data['data'].get('to')
-                    for item in data['data']['transactionData']:
-                        category = item['name']
-                        for instrument in item['paymentInstruments']:
-                            cursor.execute(
-                                "INSERT INTO aggregated_insurance (year, quarter, from_ts, to_ts, category, instrument_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-                                (year, quarter, from_ts, to_ts, category, instrument['type'], instrument['count'], instrument['amount'])
-                            )
-    conn.commit()
-
-def load_top_transaction(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    # Ensure 'data' is a dict before using .get()
-                    if not isinstance(data.get('data'), dict):
-                        continue  # Skip files with no data or wrong format
-                    for level in ['states', 'districts', 'pincodes']:
-                        items = data['data'].get(level, []) or []
-                        for item in items:
-                            cursor.execute(
-                                "INSERT INTO top_transaction (year, quarter, entity_level, entity_name, metric_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                                (
-                                    year, quarter, 
-                                    level[:-1], # state, district, pincode
-                                    item['entityName'],
-                                    item['metric']['type'],
-                                    item['metric']['count'],
-                                    item['metric']['amount']
-                                )
-                            )
-    conn.commit()
-
-def load_top_insurance(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    for level in ['states', 'districts', 'pincodes']:
-                        items = data['data'].get(level, []) or []
-                        for item in items:
-                            cursor.execute(
-                                "INSERT INTO top_insurance (year, quarter, entity_level, entity_name, metric_type, count, amount) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                                (
-                                    year, quarter, 
-                                    level[:-1], # state, district, pincode
-                                    item['entityName'],
-                                    item['metric']['type'],
-                                    item['metric']['count'],
-                                    item['metric']['amount']
-                                )
-                            )
-    conn.commit()
-
-def load_top_user(base_dir):
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith('.json'):
-                year, quarter = extract_year_quarter(root + os.sep + file)
-                with open(os.path.join(root, file)) as f:
-                    data = json.load(f)
-                    for level in ['states', 'districts', 'pincodes']:
-                        items = data['data'].get(level, []) or []
-                        for item in items:
-                            cursor.execute(
-                                "INSERT INTO top_user (year, quarter, entity_level, entity_name, registered_users) VALUES (%s, %s, %s, %s, %s)",
-                                (
-                                    year, quarter,
-                                    level[:-1], # state, district, pincode
-                                    item['name'],
-                                    item['registeredUsers']
-                                )
-                            )
-    conn.commit()
-
-# Example usage:
-load_top_transaction('top/transaction/country/india')
-load_top_insurance('top/insurance/country/india')
-load_top_user('top/user/country/india')
-
-
-
-
-# Example usage:
-load_aggregated_transaction('aggregated/transaction/country/india')
-load_aggregated_user('aggregated/user/country/india')
-load_aggregated_insurance('aggregated/insurance/country/india')
-
-
-# Example usage:
-load_transaction_hover('map/transaction/hover/country/india')
-load_user_hover('map/user/hover/country/india')
-load_insurance_hover('map/insurance/hover/country/india')
-
-cursor.close()
-conn.close()
\ No newline at end of file
+def load_aggregated_insurance(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'aggregated_insurance', aggregated_rows, writer, manifest, pool, stream, workers)
+
+def load_top_transaction(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'top_transaction', top_metric_rows, writer, manifest, pool, stream, workers)
+
+def load_top_insurance(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'top_insurance', top_metric_rows, writer, manifest, pool, stream, workers)
+
+def load_top_user(base_dir, writer, manifest, pool=None, stream=False, workers=1):
+    load_files(base_dir, 'top_user', top_user_rows, writer, manifest, pool, stream, workers)
+
+LOADS = [
+    (load_top_transaction, 'top/transaction/country/india'),
+    (load_top_insurance, 'top/insurance/country/india'),
+    (load_top_user, 'top/user/country/india'),
+    (load_aggregated_transaction, 'aggregated/transaction/country/india'),
+    (load_aggregated_user, 'aggregated/user/country/india'),
+    (load_aggregated_insurance, 'aggregated/insurance/country/india'),
+    (load_transaction_hover, 'map/transaction/hover/country/india'),
+    (load_user_hover, 'map/user/hover/country/india'),
+    (load_insurance_hover, 'map/insurance/hover/country/india'),
+    (load_insurance_grid, 'map/insurance/country/india'),
+]
+
+# Summary tables read by the dashboard: (rollup table, source table, per-period, SELECT).
+# Per-period rollups are rebuilt only for the (year, quarter) pairs a load touched;
+# the all-time rankings are rebuilt whenever their source table changed.
+# All of them read the country-level files only: the state-level files break the
+# same totals down further, so summing both would count every row twice. With
+# scope and year in the WHERE clause each per-period refresh reads one partition.
+# They group on the fact tables' dictionary ids and look each name up once per
+# group, so the summaries the dashboard reads keep plain names.
+ROLLUPS = [
+    ('rollup_transaction_category', 'aggregated_transaction', True, """
+        SELECT year, quarter, (SELECT value FROM dim_category d WHERE d.id = t.category_id), SUM(count), SUM(amount)
+        FROM aggregated_transaction t
+        WHERE scope = 'country' AND year = %s AND quarter = %s
+        GROUP BY year, quarter, category_id
+    """),
+    ('rollup_transaction_region', 'map_transaction_hover', True, """
+        SELECT year, quarter, (SELECT value FROM dim_region d WHERE d.id = t.name_id), SUM(count), SUM(amount)
+        FROM map_transaction_hover t
+        WHERE scope = 'country' AND year = %s AND quarter = %s
+        GROUP BY year, quarter, name_id
+    """),
+    ('rollup_insurance_period', 'aggregated_insurance', True, """
+        SELECT year, quarter, SUM(count), SUM(amount)
+        FROM aggregated_insurance
+        WHERE scope = 'country' AND year = %s AND quarter = %s
+        GROUP BY year, quarter
+    """),
+    ('rollup_insurance_region', 'map_insurance_hover', True, """
+        SELECT year, quarter, (SELECT value FROM dim_region d WHERE d.id = t.name_id), SUM(count), SUM(amount)
+        FROM map_insurance_hover t
+        WHERE scope = 'country' AND year = %s AND quarter = %s
+        GROUP BY year, quarter, name_id
+    """),
+    ('rollup_top_user', 'top_user', True, """
+        SELECT year, quarter, entity_level, (SELECT value FROM dim_entity d WHERE d.id = t.entity_name_id), total_users,
+               ROW_NUMBER() OVER (ORDER BY total_users DESC)
+        FROM (
+            SELECT year, quarter, entity_level, entity_name_id, SUM(registered_users) AS total_users
+            FROM top_user
+            WHERE scope = 'country' AND year = %s AND quarter = %s
+            GROUP BY year, quarter, entity_level, entity_name_id
+        ) t
+    """),
+    ('rollup_top_transaction', 'top_transaction', False, """
+        SELECT entity_level, (SELECT value FROM dim_entity d WHERE d.id = t.entity_name_id), total_count, total_amount,
+               ROW_NUMBER() OVER (PARTITION BY entity_level ORDER BY total_amount DESC)
+        FROM (
+            SELECT entity_level, entity_name_id, SUM(count) AS total_count, SUM(amount) AS total_amount
+            FROM top_transaction
+            WHERE scope = 'country'
+            GROUP BY entity_level, entity_name_id
+        ) t
+    """),
+    ('rollup_device_brand', 'aggregated_user_device', True, """
+        SELECT year, quarter, (SELECT value FROM dim_brand d WHERE d.id = t.brand_id), SUM(count)
+        FROM aggregated_user_device t
+        WHERE scope = 'country' AND year = %s AND quarter = %s
+        GROUP BY year, quarter, brand_id
+    """),
+]
+
+# Widget options and row counts, rewritten at the end of every load so the
+# dashboard reads one small table instead of scanning for DISTINCT values.
+# Each SELECT yields (dataset, kind, parent_state, value, year, quarter, row_count);
+# periods are 'YYYY Qn' values that also carry year and quarter for sorting,
+# and the 'version' row is the latest load_generation id.
+FILTER_METADATA = [
+    """SELECT 'load_generation', 'version', '', CAST(id AS CHAR), NULL, NULL, rows_loaded
+       FROM load_generation ORDER BY id DESC LIMIT 1""",
+    """SELECT 'rollup_transaction_category', 'period', '', CONCAT(year, ' Q', quarter), year, quarter, COUNT(*)
+       FROM rollup_transaction_category GROUP BY year, quarter""",
+    """SELECT 'rollup_transaction_category', 'category', '', category, NULL, NULL, COUNT(*)
+       FROM rollup_transaction_category GROUP BY category""",
+    """SELECT 'rollup_transaction_region', 'state', '', name, NULL, NULL, COUNT(*)
+       FROM rollup_transaction_region GROUP BY name""",
+    """SELECT 'rollup_insurance_period', 'period', '', CONCAT(year, ' Q', quarter), year, quarter, COUNT(*)
+       FROM rollup_insurance_period GROUP BY year, quarter""",
+    """SELECT 'rollup_top_user', 'period', '', CONCAT(year, ' Q', quarter), year, quarter, COUNT(*)
+       FROM rollup_top_user GROUP BY year, quarter""",
+    """SELECT 'rollup_top_transaction', 'entity_level', '', entity_level, NULL, NULL, COUNT(*)
+       FROM rollup_top_transaction GROUP BY entity_level""",
+    """SELECT 'rollup_device_brand', 'period', '', CONCAT(year, ' Q', quarter), year, quarter, COUNT(*)
+       FROM rollup_device_brand GROUP BY year, quarter""",
+    """SELECT 'map_insurance_grid_meta', 'state', '', parent_state, NULL, NULL, COUNT(*)
+       FROM map_insurance_grid_meta WHERE scope = 'state' GROUP BY parent_state""",
+    # Scenario 6 lists the periods of the selected region ('' is the country-level grid)
+    """SELECT 'map_insurance_grid_meta', 'period', parent_state, CONCAT(year, ' Q', quarter), year, quarter, points
+       FROM map_insurance_grid_meta""",
+]
+FILTER_METADATA += [
+    f"SELECT '{table}', 'rows', '', '{table}', NULL, NULL, COUNT(*) FROM {table}"
+    for table, columns in COLUMNS.items() if 'scope' in columns
+]
+
+def refresh_rollups(conn, touched):
+    cursor = conn.cursor()
+    try:
+        for rollup, source, per_period, select in ROLLUPS:
+            if source not in touched:
+                continue
+            start = time.perf_counter()
+            if per_period:
+                for year, quarter in sorted(touched[source]):
+                    cursor.execute(f"DELETE FROM {rollup} WHERE year = %s AND quarter = %s", (year, quarter))
+                    cursor.execute(f"INSERT INTO {rollup} {select}", (year, quarter))
+            else:
+                cursor.execute(f"DELETE FROM {rollup}")
+                cursor.execute(f"INSERT INTO {rollup} {select}")
+            conn.commit()
+            print(f"{rollup:<32} refreshed in {time.perf_counter() - start:.2f}s")
+    finally:
+        cursor.close()
+
+def pending_periods(conn):
+    """Source table -> {(year, quarter)} whose rows are loaded but not yet summarized.
+
+    Read from ``load_pending_period``, so it also holds what an earlier,
+    interrupted run loaded and never finished.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT source_table, year, quarter FROM load_pending_period")
+        pending = {}
+        for table, year, quarter in cursor.fetchall():
+            pending.setdefault(table, set()).add((year, quarter))
+        return pending
+    finally:
+        cursor.close()
+
+def record_generation(cursor, manifest, writer):
+    """Bump the data generation so dashboard caches drop results read before this load."""
+    cursor.execute(
+        "INSERT INTO load_generation (files_loaded, rows_loaded) VALUES (%s, %s)",
+        (manifest.loaded, writer.added)
+    )
+    return cursor.lastrowid
+
+def refresh_filter_metadata(cursor):
+    cursor.execute("DELETE FROM filter_metadata")
+    for select in FILTER_METADATA:
+        cursor.execute(f"INSERT INTO filter_metadata "
+                       f"(dataset, kind, parent_state, value, year, quarter, row_count) {select}")
+
+def publish_load(conn, manifest, writer, pending):
+    """Bump the generation, rewrite filter_metadata and clear the pending periods in one transaction.
+
+    Run after the rollups of ``pending`` are rebuilt. If the load stops before
+    this commits, the periods stay in ``load_pending_period`` and the next run
+    rebuilds and publishes them, even when no source file changed since. With
+    nothing pending, only filter_metadata is rewritten.
+    """
+    cursor = conn.cursor()
+    try:
+        start = time.perf_counter()
+        generation = record_generation(cursor, manifest, writer) if pending else None
+        refresh_filter_metadata(cursor)
+        if pending:
+            cursor.execute("DELETE FROM load_pending_period")
+        conn.commit()
+        print(f"{'filter_metadata':<32} refreshed in {time.perf_counter() - start:.2f}s")
+        if generation is not None:
+            print(f"data generation {generation}")
+    finally:
+        cursor.close()
+
+def report(table, rows, elapsed):
+    rate = rows / elapsed if elapsed else 0
+    print(f"{table:<24} {rows:>9,} rows  {elapsed:8.2f}s  {rate:>12,.0f} rows/s")
+
+def run_loads(writer, manifest, pool=None, stream=False, workers=1):
+    total_start = time.perf_counter()
+    for loader, base_dir in LOADS:
+        before = dict(writer.rows)
+        start = time.perf_counter()
+        loader(base_dir, writer, manifest, pool, stream, workers)
+        elapsed = time.perf_counter() - start
+        for table, rows in writer.rows.items():
+            if rows != before.get(table, 0):
+                report(table, rows - before.get(table, 0), elapsed)
+    report('total', sum(writer.rows.values()), time.perf_counter() - total_start)
+    print(f"{manifest.skipped:,} unchanged files skipped")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load the PhonePe Pulse JSON data into MySQL")
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help="write a columnar snapshot instead of loading MySQL: "
+                             "a DuckDB file if PATH ends in .duckdb, otherwise a directory of Parquet files")
+    parser.add_argument('--mode', choices=['bulk', 'row'], default='bulk',
+                        help="bulk: multi-row INSERTs in chunks; row: one INSERT per row")
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help="rows per INSERT and per commit in bulk mode")
+    parser.add_argument('--local-infile', action='store_true',
+                        help="stage bulk chunks through LOAD DATA LOCAL INFILE")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes used to decode and flatten the JSON files")
+    parser.add_argument('--stream', action='store_true',
+                        help="decode the map/ and aggregated/transaction files incrementally with ijson "
+                             "instead of json.load (falls back to json.load if ijson is not installed)")
+    parser.add_argument('--force', action='store_true',
+                        help="reload every file, even those the manifest marks as unchanged")
+    parser.add_argument('--pack', metavar='PATH',
+                        help="read the source files from a pack written by pack.py instead of the data tree")
+    parser.add_argument('--pack-access', choices=['sequential', 'mmap'], default='sequential',
+                        help="read the pack's records with sequential reads, or from a memory map")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    source = TREE
+    if args.pack:
+        import pack
+        source = pack.PackSource(args.pack, args.pack_access)
+    if args.snapshot:
+        import snapshot
+        try:
+            snapshot.build_snapshot(args.snapshot, pool, args.stream, source, args.workers)
+        finally:
+            if pool:
+                pool.shutdown()
+        return
+
+    import mysql.connector
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=args.local_infile)
+    if args.mode == 'row':
+        writer = RowWriter(conn)
+    else:
+        writer = BulkWriter(conn, chunk_size=args.chunk_size, local_infile=args.local_infile)
+    manifest = Manifest(conn, force=args.force, source=source)
+    try:
+        run_loads(writer, manifest, pool, args.stream, args.workers)
+        # This run's periods and any an interrupted run left behind
+        pending = pending_periods(conn)
+        refresh_rollups(conn, pending)
+        publish_load(conn, manifest, writer, pending)
+    finally:
+        writer.close()
+        conn.close()
+        if pool:
+            pool.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Pack the raw Pulse JSON trees into one file per dataset, with an offset index.
+
+The loaders otherwise open about 9,000 small files under ``aggregated/``,
+``map/`` and ``top/``. On network filesystems and in containers the stat and
+open calls cost more than the parsing. ``python pack.py [--source DIR]
+[--output pulse.pack]`` writes every load_sql.LOADS dataset as one NDJSON
+file (one source file per line), ordered by scope, state, year and quarter.
+``index.json`` holds, for every record, its original path, its
+(scope, parent_state, year, quarter) key, its byte offset and length, and the
+size, mtime and SHA-256 of the file it came from.
+
+``python load_sql.py --pack pulse.pack`` then reads the pack through
+``PackSource``. That is a drop-in for the data tree: paths and content hashes
+are unchanged, so the load manifest sees the same files either way. Records are
+read with plain sequential reads (``--pack-access sequential``) or sliced out
+of a memory map (``--pack-access mmap``). ``PackSource.lookup`` fetches one
+file by its key without reading the rest.
+"""
+import io
+import os
+import json
+import mmap
+import time
+import argparse
+import hashlib
+from collections import namedtuple
+
+import load_sql
+
+INDEX = 'index.json'
+FORMAT = 1
+
+# What PackSource.files reports in place of os.stat
+FileStat = namedtuple('FileStat', ['st_size', 'st_mtime'])
+Entry = namedtuple('Entry', ['path', 'dataset', 'scope', 'parent_state', 'year', 'quarter',
+                             'offset', 'length', 'size', 'mtime', 'sha256'])
+
+# (root, access) -> the PackSource unpickled in this process; see PackSource.__reduce__
+_opened = {}
+
+
+def data_file(base_dir):
+    """'map/transaction/hover/country/india' -> 'map-transaction-hover.ndjson'."""
+    return '-'.join(base_dir.split('/')[:-2]) + '.ndjson'
+
+def file_key(path):
+    """``(scope, parent_state, year, quarter)`` of a source file."""
+    return load_sql.extract_geography(path) + load_sql.extract_year_quarter(path)
+
+def record_bytes(raw):
+    # Pulse files are single-line JSON; a file with line breaks is re-encoded
+    # compactly so that it stays one NDJSON line
+    if b'\n' in raw:
+        return json.dumps(json.loads(raw), separators=(',', ':')).encode('utf-8')
+    return raw
+
+def build_pack(output, source='.'):
+    """Write the pack for the data trees under ``source`` to ``output``; return its summary."""
+    os.makedirs(output, exist_ok=True)
+    datasets, files, size = {}, 0, 0
+    for _, base_dir in load_sql.LOADS:
+        paths = [os.path.relpath(path, source)
+                 for path in load_sql.iter_json_files(os.path.join(source, base_dir))]
+        if not paths:
+            continue
+        name = data_file(base_dir)
+        entries = []
+        with open(os.path.join(output, name + '.tmp'), 'wb') as out:
+            for path in sorted(paths, key=file_key):
+                full = os.path.join(source, path)
+                stat = os.stat(full)
+                with open(full, 'rb') as f:
+                    raw = f.read()
+                record = record_bytes(raw)
+                entries.append(['/'.join(path.split(os.sep)), *file_key(path), out.tell(), len(record),
+                                stat.st_size, stat.st_mtime, hashlib.sha256(raw).hexdigest()])
+                out.write(record + b'\n')
+            size += out.tell()
+        os.replace(os.path.join(output, name + '.tmp'), os.path.join(output, name))
+        datasets[base_dir] = {'data': name, 'entries': entries}
+        files += len(entries)
+
+    # The index goes last, so a pack interrupted half-way is never read as complete
+    with open(os.path.join(output, INDEX + '.tmp'), 'w') as f:
+        json.dump({'format': FORMAT, 'datasets': datasets}, f, separators=(',', ':'))
+    os.replace(os.path.join(output, INDEX + '.tmp'), os.path.join(output, INDEX))
+    return {'datasets': len(datasets), 'files': files, 'bytes': size}
+
+
+class PackSource:
+    """load_sql's file source (see load_sql.FileTree), served from a pack.
+
+    ``access`` is 'sequential' (one buffered file per dataset, read in
+    record order) or 'mmap' (records sliced out of a read-only memory map).
+    Only the pack's location travels to loader worker processes. Each one
+    opens the pack itself on first use and keeps it open for every later
+    task, so the index is read once per process, not once per task.
+    """
+
+    def __init__(self, root, access='sequential'):
+        if access not in ('sequential', 'mmap'):
+            raise ValueError(f"unknown pack access mode: {access}")
+        self.root = root
+        self.access = access
+        self._entries = None
+        self._handles = {}
+
+    def __reduce__(self):
+        return opened, (self.root, self.access)
+
+    @property
+    def entries(self):
+        """Source path -> Entry, in pack order."""
+        return self._load()
+
+    def _load(self):
+        if self._entries is None:
+            with open(os.path.join(self.root, INDEX)) as f:
+                index = json.load(f)
+            if index.get('format') != FORMAT:
+                raise ValueError(f"{self.root} was written by an incompatible pack.py; run pack.py again")
+            self._entries = {}
+            for dataset, contents in index['datasets'].items():
+                for path, *fields in contents['entries']:
+                    path = path.replace('/', os.sep)
+                    self._entries[path] = Entry(path, dataset, *fields)
+            self._files = {dataset: contents['data'] for dataset, contents in index['datasets'].items()}
+            self._keys = {(entry.dataset, entry.scope, entry.parent_state, entry.year, entry.quarter): entry
+                          for entry in self._entries.values()}
+        return self._entries
+
+    def files(self, base_dir):
+        for entry in self.entries.values():
+            if entry.dataset == base_dir:
+                yield entry.path, FileStat(entry.size, entry.mtime)
+
+    def digest(self, path, data=None):
+        # Records may be re-encoded, so the hash is always the source file's, from the index
+        return self.entries[path].sha256
+
+    def read(self, path):
+        """The bytes of one record."""
+        entry = self.entries[path]
+        handle = self._handle(entry.dataset)
+        if self.access == 'mmap':
+            return handle[entry.offset:entry.offset + entry.length]
+        if handle.tell() != entry.offset:
+            handle.seek(entry.offset)
+        data = handle.read(entry.length + 1)  # and the newline, so the next record follows on
+        return data[:entry.length]
+
+    def open(self, path):
+        return io.BytesIO(self.read(path))
+
+    def lookup(self, dataset, scope, year, quarter, parent_state=''):
+        """The decoded JSON of one source file, found by its key."""
+        self._load()
+        return json.loads(self.read(self._keys[(dataset, scope, parent_state, year, quarter)].path))
+
+    def _handle(self, dataset):
+        handle = self._handles.get(dataset)
+        if handle is None:
+            f = open(os.path.join(self.root, self._files[dataset]), 'rb')
+            if self.access == 'mmap':
+                handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                f.close()
+            else:
+                handle = f
+            self._handles[dataset] = handle
+        return handle
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+
+def opened(root, access='sequential'):
+    """This process's PackSource for ``root``, created on first use and then reused."""
+    source = _opened.get((root, access))
+    if source is None:
+        source = _opened[(root, access)] = PackSource(root, access)
+    return source
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='.', help="directory holding aggregated/, map/ and top/")
+    parser.add_argument('--output', default='pulse.pack', help="pack directory to write")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    summary = build_pack(args.output, args.source)
+    print(f"{summary['files']:,} files in {summary['datasets']} datasets packed into {args.output} "
+          f"({summary['bytes'] / 1024 / 1024:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
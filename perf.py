@@ -0,0 +1,160 @@
+"""Per-stage timings of the dashboard's hot path.
+
+Each step of drawing a scenario is recorded as an event with its duration
+and, where it applies, a row count and a payload size in bytes. The steps are
+getting the engine, checking out a pooled connection, running the SQL,
+building the DataFrame, building the Plotly figure, and serializing and
+rendering it. Events are tagged with the session and the dashboard section
+they ran in (see ``tagged``). They are kept in bounded in-memory buffers, one
+per session, for the sidebar's Performance panel, so events recorded outside a
+session (the background prefetch) or by other sessions never push a session's
+own out. After ``configure(log_path=...)`` they are
+also written, one JSON object per line, to a size-rotated log file for
+offline analysis.
+"""
+import json
+import functools
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Stage -> what its time covers, in the order a scenario runs them
+STAGES = {
+    'engine': "get_engine()",
+    'connect': "pool checkout",
+    'sql': "statement execution and fetch",
+    'frame': "DataFrame construction and compaction",
+    'figure': "Plotly figure building",
+    'serialize': "figure to JSON when it is built (payload size)",
+    'render': "st.plotly_chart (payload sent)",
+    'section': "whole dashboard section",
+}
+
+_tags = contextvars.ContextVar('perf_tags', default={})
+_lock = threading.Lock()
+# Session tag -> its latest events; untagged events are kept under None
+_events = OrderedDict()
+EVENTS_PER_SESSION = 5000
+MAX_SESSIONS = 100
+_logger = logging.getLogger('phonepe.perf')
+_logger.propagate = False
+
+def configure(log_path=None, max_bytes=10 * 1024 * 1024, backups=5):
+    """Write every event to ``log_path``, rotated at ``max_bytes`` with ``backups`` old files kept."""
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        handler.close()
+    if log_path:
+        handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+
+@contextmanager
+def tagged(**tags):
+    """Tag every event recorded inside the block (including in ``bind``-wrapped threads)."""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+def bind(fn):
+    """``fn`` wrapped to run with the caller's tags, for handing to a worker thread."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+def record(stage, name, seconds, rows=None, nbytes=None):
+    event = {'ts': round(time.time(), 3), **_tags.get(), 'stage': stage, 'name': name,
+             'ms': round(seconds * 1000, 3), 'rows': rows, 'bytes': nbytes}
+    session = event.get('session')
+    with _lock:
+        buffer = _events.get(session)
+        if buffer is None:
+            buffer = _events[session] = deque(maxlen=EVENTS_PER_SESSION)
+            # Drop the buffer of the session that recorded nothing for longest
+            while len(_events) > MAX_SESSIONS:
+                _events.popitem(last=False)
+        else:
+            _events.move_to_end(session)
+        buffer.append(event)
+    if _logger.handlers:
+        _logger.info(json.dumps(event, default=str))
+    return event
+
+@contextmanager
+def stage(stage, name):
+    """Record the block as one ``stage`` event; set ``rows``/``bytes`` on the yielded dict to size it."""
+    sizes = {}
+    start = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        record(stage, name, time.perf_counter() - start, sizes.get('rows'), sizes.get('bytes'))
+
+def events(**tags):
+    """Buffered events whose tags match ``tags``, oldest first."""
+    with _lock:
+        if 'session' in tags:
+            snapshot = list(_events.get(tags['session'], ()))
+        else:
+            snapshot = sorted((event for buffer in _events.values() for event in buffer), key=lambda event: event['ts'])
+    return [event for event in snapshot if all(event.get(tag) == value for tag, value in tags.items())]
+
+def section_breakdown(events):
+    """Latest run of each section: its total and the milliseconds per stage recorded inside it.
+
+    ``other`` is the part of the section no stage accounts for: pandas and
+    cube work, and Streamlit's own elements. Queries run concurrently can add
+    up to more than the section took, in which case ``other`` is 0.
+    """
+    rows = []
+    for run in [event for event in events if event['stage'] == 'section'][::-1]:
+        if any(row['section'] == run['name'] for row in rows):
+            continue
+        started = run['ts'] - run['ms'] / 1000
+        inside = [event for event in events
+                  if event is not run and event.get('section') == run['name']
+                  and started - 0.001 <= event['ts'] <= run['ts'] + 0.001]
+        row = {'section': run['name'], 'total_ms': run['ms']}
+        for name in STAGES:
+            # A section run inside this one (a nested fragment) is reported whole
+            row['nested' if name == 'section' else name] = sum(event['ms'] for event in inside if event['stage'] == name)
+        row['other'] = max(run['ms'] - sum(value for key, value in row.items() if key not in ('section', 'total_ms')), 0)
+        row['rows'] = sum(event['rows'] or 0 for event in inside if event['stage'] == 'sql')
+        row['payload_kb'] = sum(event['bytes'] or 0 for event in inside if event['stage'] == 'render') / 1024
+        rows.append(row)
+    return rows
+
+def chart_payloads(events):
+    """Latest draw of each chart: its payload and render time, and how often it was drawn and built."""
+    rows, builds = {}, {}
+    for event in events:
+        if event['stage'] == 'render':
+            row = rows.setdefault(event['name'], {'chart': event['name'], 'draws': 0})
+            row.update(section=event.get('section'), payload_kb=(event['bytes'] or 0) / 1024, render_ms=event['ms'])
+            row['draws'] += 1
+        elif event['stage'] == 'figure':
+            builds[event['name']] = builds.get(event['name'], 0) + 1
+    for name, row in rows.items():
+        row['builds'] = builds.get(name, 0)
+    return sorted(rows.values(), key=lambda row: row['payload_kb'], reverse=True)
+
+def stage_totals(events):
+    """Calls, time, rows and bytes per stage over ``events``."""
+    rows = []
+    for name in STAGES:
+        matching = [event for event in events if event['stage'] == name]
+        if not matching:
+            continue
+        total = sum(event['ms'] for event in matching)
+        rows.append({
+            'stage': name, 'calls': len(matching), 'total_ms': total, 'avg_ms': total / len(matching),
+            'max_ms': max(event['ms'] for event in matching),
+            'rows': sum(event['rows'] or 0 for event in matching),
+            'kb': sum(event['bytes'] or 0 for event in matching) / 1024,
+        })
+    return rows
@@ -1,25 +1,233 @@
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import streamlit as st
-from sqlalchemy import create_engine, text
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from sqlalchemy import create_engine, event, text
+# Plotly is imported by the functions that draw charts, so the page starts
+# rendering before it has loaded, and plotly.subplots only loads for Scenario 2
 
-# SQLAlchemy database connection using Streamlit secrets
-def get_engine():
+import cube
+import perf
+import figures
+import queries
+import prefetch
+from query_cache import QueryCache, cache_key
+from load_sql import GRID_CELLS_PER_DEGREE
+
+# Connection pool settings; any of them can be overridden in the [mysql] section of secrets.toml
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+}
+
+class PoolStats:
+    """Counters for the shared connection pool, shown in the sidebar."""
+
+    def __init__(self, engine, capacity):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.connects = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        event.listen(engine.pool, 'connect', self._on_connect)
+        event.listen(engine.pool, 'checkout', self._on_checkout)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.checkouts += 1
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+
+# Optional secrets.toml section; an empty dict when it (or the whole file) is missing
+def secrets_section(name):
     try:
+        return st.secrets.get(name, {})
+    except FileNotFoundError:
+        return {}
+
+# One SQLAlchemy engine (and connection pool) per server process, shared by all sessions and reruns
+@st.cache_resource
+def create_shared_engine():
+    # A columnar snapshot written by `load_sql.py --snapshot` replaces MySQL entirely
+    snapshot_config = secrets_section("snapshot")
+    if snapshot_config.get("path"):
+        from snapshot import create_snapshot_engine
+        pool_options = {key: snapshot_config.get(key, default) for key, default in POOL_DEFAULTS.items()}
+        engine = create_snapshot_engine(snapshot_config["path"], **pool_options)
+    else:
         # Get database credentials from Streamlit secrets
         db_config = st.secrets["mysql"]
         connection_string = (
             f"mysql+pymysql://{db_config['username']}:{db_config['password']}"
             f"@{db_config['host']}:{db_config['port']}/{db_config['database']}"
         )
-        engine = create_engine(connection_string)
-        return engine
+        pool_options = {key: db_config.get(key, default) for key, default in POOL_DEFAULTS.items()}
+        engine = create_engine(connection_string, **pool_options)
+    engine.pool_stats = PoolStats(engine, pool_options['pool_size'] + pool_options['max_overflow'])
+    fill_pool(engine, pool_options['pool_size'])
+    return engine
+
+# Open every pooled connection up front, so the first sessions after a start don't each pay for a connect
+def fill_pool(engine, size):
+    connections = [engine.connect() for _ in range(size)]
+    for conn in connections:
+        conn.close()
+
+# SQLAlchemy database connection using Streamlit secrets
+def get_engine():
+    try:
+        with perf.stage('engine', 'get_engine'):
+            return create_shared_engine()
     except Exception as e:
         st.error(f"Database connection failed: {str(e)}")
         return None
 
+@contextmanager
+def connect(engine):
+    """``engine.connect()`` that also records when the pool made us wait for a connection."""
+    pool = engine.pool
+    exhausted = pool.checkedout() >= engine.pool_stats.capacity
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        elapsed = time.perf_counter() - start
+        perf.record('connect', 'pool checkout', elapsed)
+        if exhausted:
+            engine.pool_stats.record_wait(elapsed)
+        yield conn
+
+# Query results shared by all sessions; [cache] ttl / max_mb can be set in secrets.toml
+@st.cache_resource
+def get_query_cache():
+    cache_config = secrets_section("cache")
+    return QueryCache(
+        ttl=cache_config.get('ttl', 600),
+        max_bytes=int(cache_config.get('max_mb', 256) * 1024 * 1024),
+    )
+
+# Latest load generation recorded by load_sql.py; a new one invalidates the query cache.
+# Errors propagate, so QueryCache.generation keeps the last known generation through them.
+def fetch_generation(engine):
+    with connect(engine) as conn:
+        return conn.execute(queries.statement('load_generation')).scalar() or 0
+
+def run_query(engine, name, params=None):
+    """Run the named statement from queries.py through the shared query cache.
+
+    Returns a copy, so callers are free to modify the frame.
+    """
+    return cached_query(get_query_cache(), engine, name, params)
+
+# The body of run_query; it makes no Streamlit calls, so worker threads can run it too
+def cached_query(cache, engine, name, params=None, ttl=None):
+    generation = cache.generation(lambda: fetch_generation(engine))
+
+    def load():
+        with connect(engine) as conn:
+            return queries.execute(conn, name, params)
+
+    return cache.get_or_load(cache_key(name, params), load, generation, ttl).copy()
+
+# Worker threads for a scenario's independent queries, shared by all sessions;
+# one per pooled connection, so they never queue for a connection
+@st.cache_resource
+def get_query_executor():
+    return ThreadPoolExecutor(max_workers=create_shared_engine().pool.size(), thread_name_prefix='query')
+
+@contextmanager
+def concurrent_queries(engine):
+    """Run a scenario's independent queries in parallel on pooled connections.
+
+    Yields ``submit(name, params=None)``, which starts a named query and
+    returns a Future of its DataFrame, so each chart can render as soon as
+    its own result arrives. When the block is left early, including when
+    Streamlit stops the script because a filter changed and it is about to
+    rerun, queries that have not started yet are cancelled. Queries already
+    running finish and land in the shared cache.
+    """
+    executor = get_query_executor()
+    cache = get_query_cache()
+    futures = []
+
+    def submit(name, params=None):
+        future = executor.submit(perf.bind(cached_query), cache, engine, name, params)
+        futures.append(future)
+        return future
+
+    try:
+        yield submit
+    finally:
+        for future in futures:
+            future.cancel()
+
+# Built figures shared by all sessions, with their payload size; [cache] figure_mb in
+# secrets.toml caps their memory. Its generation is the query cache's, handed
+# over on every draw (see plot_cached), so it never re-reads it itself.
+@st.cache_resource
+def get_figure_cache():
+    cache_config = secrets_section("cache")
+    return QueryCache(
+        ttl=cache_config.get('ttl', 600),
+        max_bytes=int(cache_config.get('figure_mb', 64) * 1024 * 1024),
+        generation_ttl=0,
+        size=lambda entry: entry[1],
+    )
+
+# Structured performance log, if [perf] log is set in secrets.toml; configured once per server process
+@st.cache_resource
+def configure_perf_log():
+    perf_config = secrets_section("perf")
+    perf.configure(
+        perf_config.get('log'),
+        max_bytes=int(perf_config.get('max_mb', 10) * 1024 * 1024),
+        backups=perf_config.get('backups', 5),
+    )
+
+# The rollup tables as NumPy cubes (cube.py), rebuilt once per data generation
+# and shared by all sessions; the previous generation's cubes are dropped
+@st.cache_resource(max_entries=1)
+def build_cubes(_engine, generation):
+    def load(name):
+        with connect(_engine) as conn:
+            return queries.execute(conn, name)
+
+    return cube.build_cubes(load)
+
+def get_cubes(engine):
+    generation = get_query_cache().generation(lambda: fetch_generation(engine))
+    return build_cubes(engine, generation)
+
+# Widget options written by load_sql.py at the end of each load (filter_metadata),
+# read once per data generation and grouped so each widget's options are one lookup
+@st.cache_resource(max_entries=1)
+def load_filter_metadata(_engine, generation):
+    with connect(_engine) as conn:
+        df = queries.execute(conn, 'filter_metadata')
+    return {key: rows.reset_index(drop=True) for key, rows in df.groupby(['dataset', 'kind', 'parent_state'], observed=True)}
+
+def filter_options(engine, dataset, kind, parent_state=''):
+    """One widget's options: ``value`` rows, with ``year``/``quarter`` for periods (oldest first)."""
+    generation = get_query_cache().generation(lambda: fetch_generation(engine))
+    options = load_filter_metadata(engine, generation).get((dataset, kind, parent_state))
+    return options if options is not None else pd.DataFrame(columns=['value', 'year', 'quarter', 'row_count'])
+
+def filter_years(engine, dataset):
+    return sorted({int(year) for year in filter_options(engine, dataset, 'period')['year']})
+
 # Test database connection
 def test_db():
     engine = get_engine()
@@ -27,15 +235,156 @@ def test_db():
         return
         
     try:
-        with engine.connect() as conn:
+        with connect(engine) as conn:
             result = conn.execute(text("SELECT 1, 2"))
             row = result.fetchone()
             st.sidebar.success(f"Database test successful! Result: {row}")
     except Exception as e:
         st.sidebar.error(f"Database test failed: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
+
+# Query cache metrics
+def show_cache_status():
+    stats = get_query_cache().stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Hit ratio", f"{stats['hit_ratio']:.0%}")
+    col2.metric("Entries", stats['entries'])
+    col3.metric("Memory", f"{stats['bytes'] / 1024 / 1024:.1f} MB")
+    st.caption(f"{stats['hits']:,} hits, {stats['misses']:,} misses, {stats['shared']:,} shared loads, "
+               f"{stats['evictions']:,} evictions, data generation {stats['generation']}")
+    if st.button("Clear query cache"):
+        get_query_cache().clear()
+    run = prefetch.latest()
+    if run:
+        status = run.status()
+        state = "done" if status['finished'] else "running"
+        st.caption(f"Prefetch ({state}): {status['loaded']:,}/{status['total']:,} filter combination results "
+                   f"in {status['seconds']:.1f}s, {status['errors']} failed")
+
+# Connection pool metrics
+def show_pool_status():
+    engine = get_engine()
+    if not engine:
+        return
+    pool, stats = engine.pool, engine.pool_stats
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Checked out", pool.checkedout())
+    col2.metric("Idle", pool.checkedin())
+    col3.metric("Overflow", max(pool.overflow(), 0))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Opened", stats.connects)
+    col2.metric("Checkouts", stats.checkouts)
+    col3.metric("Waits", stats.waits)
+    st.caption(f"Pool size {pool.size()}, capacity {stats.capacity}, "
+                       f"time spent waiting {stats.wait_seconds * 1000:.0f} ms")
+
+# Shape and memory of the current generation's cubes
+def show_cube_status():
+    engine = get_engine()
+    if not engine:
+        return
+    try:
+        cubes = get_cubes(engine)
+    except Exception as e:
+        st.error(f"Cube build failed: {str(e)}")
+        return
+    st.dataframe(
+        pd.DataFrame([
+            {'cube': name, 'shape': ' x '.join(str(len(c.labels[dim])) for dim in c.dims),
+             'filled': f"{c.present.mean():.0%}", 'kb': c.nbytes / 1024}
+            for name, c in cubes.items()
+        ]).round(1),
+        use_container_width=True, hide_index=True
+    )
+
+# Per-statement execution times (queries served from the cache are not counted)
+def show_query_stats():
+    stats = queries.stats()
+    if not stats:
+        st.caption("No queries executed yet.")
+        return
+    st.dataframe(
+        pd.DataFrame(stats)[['statement', 'calls', 'avg_ms', 'max_ms']].round(1),
+        use_container_width=True, hide_index=True
+    )
+
+# Tags this session's perf.py events; fragment reruns re-apply it in timed_section
+def perf_session():
+    return st.session_state.setdefault('perf_session', uuid.uuid4().hex[:8])
+
+# Where this session's time went, per dashboard section and per stage (perf.py)
+def show_performance():
+    events = perf.events(session=perf_session())
+    if not events:
+        st.caption("Nothing recorded yet.")
+        return
+    st.caption("Latest run of each section, ms per stage")
+    st.dataframe(pd.DataFrame(perf.section_breakdown(events)).round(1), use_container_width=True, hide_index=True)
+    st.caption("This session's totals per stage")
+    st.dataframe(pd.DataFrame(perf.stage_totals(events)).round(1), use_container_width=True, hide_index=True)
+    st.caption("Charts: payload sent to the browser and render time of the latest draw")
+    st.dataframe(pd.DataFrame(perf.chart_payloads(events)).round(1), use_container_width=True, hide_index=True)
+    st.caption("The sidebar refreshes on full page runs.")
+
+def plot_chart(fig, nbytes):
+    """``st.plotly_chart``, timed and tagged with the figure's payload size."""
+    with perf.stage('render', fig.layout.title.text or 'chart') as render:
+        render['bytes'] = nbytes
+        st.plotly_chart(fig, use_container_width=True)
+
+def plot_cached(engine, key, build):
+    """Draw the figure ``build()`` returns, built once per data generation and ``key``.
+
+    ``key`` is a tuple: the chart's title, then every filter value the chart
+    depends on. A cached figure skips building and sizing. Streamlit still
+    serializes it on every draw, and its payload is reported with the render.
+    """
+    generation = get_query_cache().generation(lambda: fetch_generation(engine))
+    # A new generation clears the figure cache's old figures right away, not
+    # only when their keys come up again
+    figure_cache = get_figure_cache()
+    figure_cache.generation(lambda: generation)
+
+    def load():
+        with perf.stage('figure', key[0]):
+            fig = build()
+        with perf.stage('serialize', key[0]) as payload:
+            payload['bytes'] = figures.payload_bytes(fig)
+        return fig, payload['bytes']
+
+    fig, nbytes = figure_cache.get_or_load(key, load, generation)
+    plot_chart(fig, nbytes)
+
+@contextmanager
+def timed_section(name):
+    """Caption the block with its render time next to the last full run of the page.
+
+    A fragment rerun skips everything outside the fragment, so the difference
+    between the two numbers is the work a partial rerun saved. The block's
+    perf.py events are tagged with the section.
+    """
+    start = time.perf_counter()
+    # The section's own event is tagged with the enclosing section, if any
+    with perf.tagged(session=perf_session()), perf.stage('section', name), perf.tagged(section=name):
+        yield
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    page_ms = st.session_state.get('page_run_ms')
+    note = f"⏱ {name}: {elapsed_ms:.0f} ms"
+    if page_ms:
+        note += f" (last full page run: {page_ms:.0f} ms)"
+    st.caption(note)
+
+# A below-the-fold section that is only built once it is switched on. It is a
+# fragment of its own, so switching it on or off reruns nothing else.
+@st.fragment
+def lazy_section(title, key, render, *args):
+    st.subheader(title)
+    if not st.toggle("Show chart", key=key):
+        return
+    try:
+        with timed_section(title):
+            render(*args)
+    except Exception as e:
+        st.error(f"Error in {title}: {str(e)}")
 
 # Scenario 1: Transaction behavior analysis
 def scenario_1():
@@ -43,95 +392,89 @@ def scenario_1():
     engine = get_engine()
     if not engine:
         return
-        
+
+    try:
+        # Filter options are read on full reruns only
+        years = filter_years(engine, 'rollup_transaction_category')
+    except Exception as e:
+        st.error(f"Error in Scenario 1: {str(e)}")
+        return
+    scenario_1_view(engine, years)
+
+# Changing the year reruns only this fragment
+@st.fragment
+def scenario_1_view(engine, years):
+    import plotly.express as px
+
     try:
         # Year selection
-        with engine.connect() as conn:
-            years = pd.read_sql("SELECT DISTINCT year FROM aggregated_transaction ORDER BY year", conn)['year'].tolist()
         selected_year = st.selectbox("Select Year", years, index=len(years)-1)
-        
-        with st.spinner("Loading transaction data..."):
-            # Query for category trends
-            category_query = text(f"""
-                SELECT quarter, category, 
-                       SUM(count) as total_count, 
-                       SUM(amount) as total_amount
-                FROM aggregated_transaction
-                WHERE year = {selected_year}
-                GROUP BY quarter, category
-            """)
-            
-            # Query for state-level trends
-            state_query = text(f"""
-                SELECT quarter, name AS state, 
-                       SUM(count) as total_count, 
-                       SUM(amount) as total_amount
-                FROM map_transaction_hover
-                WHERE year = {selected_year}
-                GROUP BY quarter, name
-            """)
-            
-            with engine.connect() as conn:
-                category_df = pd.read_sql(category_query, conn)
-                state_df = pd.read_sql(state_query, conn)
-                
+
+        with timed_section("Scenario 1"), st.spinner("Loading transaction data..."):
+            # Category and state-level trends, sliced from the cubes
+            cubes = get_cubes(engine)
+            categories = cubes['transaction_category'].slice(year=selected_year)
+            states = cubes['transaction_region'].slice(year=selected_year)
+            category_df = categories.rollup('quarter', 'category').to_frame()
+
             # Metrics
             col1, col2, col3 = st.columns(3)
             col1.metric("Total Transactions", f"{category_df['total_count'].sum():,}")
             col2.metric("Total Amount", f"₹{category_df['total_amount'].sum():,.2f}")
-            col3.metric("Regions Covered (States & Districts)", state_df['state'].nunique())
-            
+
             # Category distribution
             st.subheader(f"Transaction Distribution by Category ({selected_year})")
             if not category_df.empty:
-                fig = px.pie(
-                    category_df.groupby('category')['total_amount'].sum().reset_index(),
-                    names='category',
-                    values='total_amount',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.qualitative.Pastel,
-                    title='Transaction Value by Category'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
+                def category_pie():
+                    return px.pie(
+                        categories.rollup('category').to_frame(),
+                        names='category',
+                        values='total_amount',
+                        hole=0.4,
+                        color_discrete_sequence=px.colors.qualitative.Pastel,
+                        title='Transaction Value by Category'
+                    )
+                plot_cached(engine, ('Transaction Value by Category', selected_year), category_pie)
+
             # State performance
+            state_df = states.rollup('quarter', 'state').to_frame()
+            col3.metric("States Covered", state_df['state'].nunique())
             st.subheader(f"State Performance by Quarter ({selected_year})")
             if not state_df.empty:
-                top_states = state_df.groupby('state')['total_amount'].sum().nlargest(10).index
-                filtered_df = state_df[state_df['state'].isin(top_states)]
-                
-                fig = px.bar(
-                    filtered_df,
-                    x='quarter',
-                    y='total_amount',
-                    color='state',
-                    barmode='group',
-                    labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
-                    title='Top 10 States by Transaction Amount'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
+                top_states = states.top_k('total_amount', 10, 'state')['state']
+                filtered_df = states.slice(state=top_states).rollup('quarter', 'state').to_frame()
+
+                def state_bars():
+                    return px.bar(
+                        filtered_df,
+                        x='quarter',
+                        y='total_amount',
+                        color='state',
+                        barmode='group',
+                        labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
+                        title='Top 10 States by Transaction Amount'
+                    )
+                plot_cached(engine, ('Top 10 States by Transaction Amount', selected_year), state_bars)
+
             # Growth trends
             st.subheader(f"Category Growth Trends ({selected_year})")
             if not category_df.empty:
-                fig = px.line(
-                    category_df,
-                    x='quarter',
-                    y='total_amount',
-                    color='category',
-                    markers=True,
-                    labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
-                    title='Transaction Growth by Category'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
+                def category_lines():
+                    return px.line(
+                        category_df,
+                        x='quarter',
+                        y='total_amount',
+                        color='category',
+                        markers=True,
+                        labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
+                        title='Transaction Growth by Category'
+                    )
+                plot_cached(engine, ('Transaction Growth by Category', selected_year), category_lines)
+
             st.success("Transaction behavior analysis completed!")
-            
+
     except Exception as e:
         st.error(f"Error in Scenario 1: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
 
 # Scenario 2: Insurance growth analysis
 def scenario_2():
@@ -139,133 +482,131 @@ def scenario_2():
     engine = get_engine()
     if not engine:
         return
-        
+
+    try:
+        # Filter options are read on full reruns only
+        years = filter_years(engine, 'rollup_insurance_period')
+    except Exception as e:
+        st.error(f"Error in Scenario 2: {str(e)}")
+        return
+    scenario_2_view(engine, years)
+
+# Changing the year range reruns only this fragment
+@st.fragment
+def scenario_2_view(engine, years):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     try:
         # Year range selection
-        with engine.connect() as conn:
-            years = pd.read_sql("SELECT DISTINCT year FROM aggregated_insurance ORDER BY year", conn)['year'].tolist()
         start_year, end_year = st.select_slider(
             "Select Year Range",
             options=years,
             value=(min(years), max(years)))
-        
-        with st.spinner("Loading insurance data..."):
-            # Insurance growth query
-            growth_query = text(f"""
-                SELECT year, quarter, 
-                       SUM(count) as total_policies, 
-                       SUM(amount) as total_premium
-                FROM aggregated_insurance
-                WHERE year BETWEEN {start_year} AND {end_year}
-                GROUP BY year, quarter
-                ORDER BY year, quarter
-            """)
-            
-            # State-level opportunities query
-            state_query = text(f"""
-                SELECT name AS state, 
-                       SUM(count) as total_policies, 
-                       SUM(amount) as total_premium
-                FROM map_insurance_hover
-                WHERE year BETWEEN {start_year} AND {end_year}
-                GROUP BY name
-            """)
-            
-            with engine.connect() as conn:
-                growth_df = pd.read_sql(growth_query, conn)
-                state_df = pd.read_sql(state_query, conn)
-                
+
+        with timed_section("Scenario 2"), st.spinner("Loading insurance data..."):
+            # Insurance growth and state-level opportunities, sliced from the cubes
+            cubes = get_cubes(engine)
+            year_range = range(start_year, end_year + 1)
+            growth_df = cubes['insurance_period'].growth('total_premium', 'yoy')
+            growth_df = growth_df[growth_df['year'].isin(year_range)].reset_index(drop=True)
+            states = cubes['insurance_region'].slice(year=year_range)
+
             # Metrics
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns(4)
             col1.metric("Total Policies", f"{growth_df['total_policies'].sum():,}")
             col2.metric("Total Premium", f"₹{growth_df['total_premium'].sum():,.2f}")
-            col3.metric("Regions Covered (States & Districts)", state_df['state'].nunique())
-            
+            # Year-on-year growth of the latest quarter, against the same quarter a year earlier
+            latest_growth = growth_df['growth'].iloc[-1] if not growth_df.empty else float('nan')
+            col4.metric("Premium Growth (YoY)", "n/a" if pd.isna(latest_growth) else f"{latest_growth:+.1%}")
+
             # Growth trends
             st.subheader(f"Insurance Growth ({start_year}-{end_year})")
             if not growth_df.empty:
                 growth_df['period'] = growth_df['year'].astype(str) + ' Q' + growth_df['quarter'].astype(str)
-                
-                fig = make_subplots(specs=[[{"secondary_y": True}]])
-                
-                fig.add_trace(
-                    go.Bar(
-                        x=growth_df['period'],
-                        y=growth_df['total_policies'],
-                        name='Policies',
-                        marker_color='#1f77b4'
-                    ),
-                    secondary_y=False
-                )
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=growth_df['period'],
-                        y=growth_df['total_premium'],
-                        name='Premium (₹)',
-                        mode='lines+markers',
-                        line=dict(color='#ff7f0e'),
-                        marker=dict(size=8)
-                    ),
-                    secondary_y=True
-                )
-                
-                fig.update_layout(
-                    title='Insurance Policy and Premium Growth',
-                    xaxis=dict(title='Quarter', tickangle=45),
-                    yaxis=dict(title='Number of Policies', color='#1f77b4'),
-                    yaxis2=dict(title='Total Premium (₹)', overlaying='y', side='right', color='#ff7f0e'),
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-            
+
+                def growth_chart():
+                    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+                    fig.add_trace(
+                        go.Bar(
+                            x=growth_df['period'],
+                            y=growth_df['total_policies'],
+                            name='Policies',
+                            marker_color='#1f77b4'
+                        ),
+                        secondary_y=False
+                    )
+
+                    fig.add_trace(
+                        go.Scatter(
+                            x=growth_df['period'],
+                            y=growth_df['total_premium'],
+                            name='Premium (₹)',
+                            mode='lines+markers',
+                            line=dict(color='#ff7f0e'),
+                            marker=dict(size=8)
+                        ),
+                        secondary_y=True
+                    )
+
+                    fig.update_layout(
+                        title='Insurance Policy and Premium Growth',
+                        xaxis=dict(title='Quarter', tickangle=45),
+                        yaxis=dict(title='Number of Policies', color='#1f77b4'),
+                        yaxis2=dict(title='Total Premium (₹)', overlaying='y', side='right', color='#ff7f0e'),
+                        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                    )
+
+                    return fig
+                plot_cached(engine, ('Insurance Policy and Premium Growth', start_year, end_year), growth_chart)
+
             # State opportunities
+            col3.metric("States Covered", len(states.rollup('state').to_frame()))
             st.subheader("State-Level Opportunities")
-            if not state_df.empty:
+            if states.present.any():
                 # Top states and opportunity states
-                top_states = state_df.nlargest(10, 'total_policies')
-                opportunity_states = state_df.nsmallest(10, 'total_policies')
-                
-                fig = make_subplots(rows=1, cols=2, subplot_titles=('Top States by Policies', 'High Opportunity States'))
-                
-                fig.add_trace(
-                    go.Bar(
-                        x=top_states['total_policies'],
-                        y=top_states['state'],
-                        orientation='h',
-                        marker_color='#1f77b4',
-                        name='Policies'
-                    ),
-                    row=1, col=1
-                )
-                
-                fig.add_trace(
-                    go.Bar(
-                        x=opportunity_states['total_policies'],
-                        y=opportunity_states['state'],
-                        orientation='h',
-                        marker_color='#ff7f0e',
-                        name='Policies'
-                    ),
-                    row=1, col=2
-                )
-                
-                fig.update_layout(
-                    title='Insurance Market Analysis by State',
-                    showlegend=False,
-                    height=600
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
+                top_states = states.top_k('total_policies', 10, 'state')
+                opportunity_states = states.top_k('total_policies', 10, 'state', largest=False)
+
+                def state_chart():
+                    fig = make_subplots(rows=1, cols=2, subplot_titles=('Top States by Policies', 'High Opportunity States'))
+
+                    fig.add_trace(
+                        go.Bar(
+                            x=top_states['total_policies'],
+                            y=top_states['state'],
+                            orientation='h',
+                            marker_color='#1f77b4',
+                            name='Policies'
+                        ),
+                        row=1, col=1
+                    )
+
+                    fig.add_trace(
+                        go.Bar(
+                            x=opportunity_states['total_policies'],
+                            y=opportunity_states['state'],
+                            orientation='h',
+                            marker_color='#ff7f0e',
+                            name='Policies'
+                        ),
+                        row=1, col=2
+                    )
+
+                    fig.update_layout(
+                        title='Insurance Market Analysis by State',
+                        showlegend=False,
+                        height=600
+                    )
+
+                    return fig
+                plot_cached(engine, ('Insurance Market Analysis by State', start_year, end_year), state_chart)
+
             st.success("Insurance growth analysis completed!")
-            
+
     except Exception as e:
         st.error(f"Error in Scenario 2: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
 
 # Scenario 3: Transaction trends analysis
 def scenario_3():
@@ -273,107 +614,125 @@ def scenario_3():
     engine = get_engine()
     if not engine:
         return
-        
+
     try:
-        # Filters
-        with engine.connect() as conn:
-            years = pd.read_sql("SELECT DISTINCT year FROM aggregated_transaction ORDER BY year", conn)['year'].tolist()
-            categories = pd.read_sql("SELECT DISTINCT category FROM aggregated_transaction", conn)['category'].tolist()
-        
-        col1, col2 = st.columns(2)
-        selected_year = col1.selectbox("Select Year", years, index=len(years)-1, key='sc3_year')
-        selected_categories = col2.multiselect("Select Categories", categories, default=categories, key='sc3_cat')
-        
-        with st.spinner("Loading transaction trend data..."):
-            # Category trends query
-            category_query = text(f"""
-                SELECT quarter, category, 
-                       SUM(count) as total_count, 
-                       SUM(amount) as total_amount
-                FROM aggregated_transaction
-                WHERE year = {selected_year}
-                {'AND category IN (' + ','.join([f"'{cat}'" for cat in selected_categories]) + ')' if selected_categories else ''}
-                GROUP BY quarter, category
-            """)
-            
-            # Regional trends query
-            region_query = text(f"""
-                SELECT quarter, name AS region, 
-                       SUM(count) as total_count, 
-                       SUM(amount) as total_amount
-                FROM map_transaction_hover
-                WHERE year = {selected_year}
-                GROUP BY quarter, name
-            """)
-            
-            with engine.connect() as conn:
-                category_df = pd.read_sql(category_query, conn)
-                region_df = pd.read_sql(region_query, conn)
-                
+        # Filter options are read on full reruns only
+        years = filter_years(engine, 'rollup_transaction_category')
+        categories = filter_options(engine, 'rollup_transaction_category', 'category')['value'].tolist()
+    except Exception as e:
+        st.error(f"Error in Scenario 3: {str(e)}")
+        return
+    scenario_3_view(engine, years, categories)
+
+# Changing the year reruns this fragment, including the category section nested in it
+@st.fragment
+def scenario_3_view(engine, years, categories):
+    try:
+        selected_year = st.selectbox("Select Year", years, index=len(years)-1, key='sc3_year')
+
+        with timed_section("Scenario 3"), st.spinner("Loading transaction trend data..."):
+            scenario_3_categories(engine, selected_year, categories)
+
+            # Regional trends (the same slice scenario 1 reads)
+            regions = get_cubes(engine)['transaction_region'].slice(year=selected_year)
+            region_df = regions.rollup('quarter', 'state').to_frame().rename(columns={'state': 'region'})
+            st.metric("States Covered", region_df['region'].nunique())
+
+        # Regional heatmap and expansion opportunities, built on demand from one chart-ready query
+        if not region_df.empty:
+            lazy_section(f"Regional Performance Heatmap ({selected_year})", 'sc3_heatmap',
+                         region_heatmap, engine, selected_year)
+            lazy_section("Expansion Opportunity Analysis", 'sc3_scatter', region_growth_scatter, engine, selected_year)
+
+        st.success("Transaction trend analysis completed!")
+
+    except Exception as e:
+        st.error(f"Error in Scenario 3: {str(e)}")
+
+# Changing the categories reruns only this fragment, not the regional sections
+@st.fragment
+def scenario_3_categories(engine, selected_year, categories):
+    import plotly.express as px
+
+    try:
+        selected_categories = st.multiselect("Select Categories", categories, default=categories, key='sc3_cat')
+
+        with timed_section("Category Trends"):
+            # Category trends (every category when none is selected)
+            category_cube = get_cubes(engine)['transaction_category'].slice(year=selected_year)
+            if selected_categories:
+                category_df = category_cube.slice(category=selected_categories).to_frame()
+            else:
+                category_df = category_cube.to_frame()
+
             # Metrics
-            col1, col2, col3 = st.columns(3)
+            col1, col2 = st.columns(2)
             col1.metric("Total Transactions", f"{category_df['total_count'].sum():,}")
             col2.metric("Total Amount", f"₹{category_df['total_amount'].sum():,.2f}")
-            col3.metric("Regions Covered", region_df['region'].nunique())
-            
+
             # Category trends
             st.subheader(f"Category Trends ({selected_year})")
             if not category_df.empty:
-                fig = px.line(
-                    category_df,
-                    x='quarter',
-                    y='total_amount',
-                    color='category',
-                    markers=True,
-                    labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
-                    title='Transaction Value by Category'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Regional heatmap
-            st.subheader(f"Regional Performance Heatmap ({selected_year})")
-            if not region_df.empty:
-                pivot_df = region_df.pivot(index='region', columns='quarter', values='total_amount').fillna(0)
-                
-                fig = px.imshow(
-                    pivot_df,
-                    labels=dict(x="Quarter", y="Region", color="Amount (₹)"),
-                    color_continuous_scale='YlGnBu',
-                    aspect="auto"
-                )
-                fig.update_layout(
-                    title='Transaction Amount by Region and Quarter',
-                    xaxis=dict(tickangle=0),
-                    height=600
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Expansion opportunities
-            st.subheader("Expansion Opportunity Analysis")
-            if not region_df.empty:
-                region_growth = region_df.groupby('region')['total_amount'].sum().reset_index()
-                region_growth['growth_potential'] = region_growth['total_amount'].rank(pct=True)
-                
-                fig = px.scatter(
-                    region_growth,
-                    x='total_amount',
-                    y='growth_potential',
-                    size='total_amount',
-                    color='growth_potential',
-                    hover_name='region',
-                    color_continuous_scale='RdYlGn',
-                    labels={'total_amount': 'Total Amount (₹)', 'growth_potential': 'Growth Potential'},
-                    title='Region Growth Potential Analysis'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-            st.success("Transaction trend analysis completed!")
-            
+                def category_lines():
+                    return px.line(
+                        category_df,
+                        x='quarter',
+                        y='total_amount',
+                        color='category',
+                        markers=True,
+                        labels={'total_amount': 'Amount (₹)', 'quarter': 'Quarter'},
+                        title='Transaction Value by Category'
+                    )
+                plot_cached(engine, ('Transaction Value by Category', selected_year, tuple(selected_categories)), category_lines)
+
     except Exception as e:
         st.error(f"Error in Scenario 3: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
+
+# One row per region, its quarters pivoted into columns q1-q4 by the query
+QUARTER_COLUMNS = {'q1': 1, 'q2': 2, 'q3': 3, 'q4': 4}
+
+def region_heatmap(engine, year):
+    import plotly.express as px
+
+    def heatmap():
+        # The largest regions get a row each and the rest share an "Others" row
+        region_df = figures.top_n_with_others(run_query(engine, 'chart_region_quarters', {'year': year}),
+                                              'region', 'total_amount')
+        pivot_df = region_df.set_index('region')[list(QUARTER_COLUMNS)].rename(columns=QUARTER_COLUMNS)
+        # Quarters not loaded yet sum to zero for every region
+        pivot_df = pivot_df.loc[:, pivot_df.any()]
+        fig = px.imshow(
+            pivot_df,
+            labels=dict(x="Quarter", y="Region", color="Amount (₹)"),
+            color_continuous_scale='YlGnBu',
+            aspect="auto"
+        )
+        fig.update_layout(
+            title='Transaction Amount by Region and Quarter',
+            xaxis=dict(tickangle=0),
+            height=600
+        )
+        return fig
+    plot_cached(engine, ('Transaction Amount by Region and Quarter', year), heatmap)
+
+def region_growth_scatter(engine, year):
+    import plotly.express as px
+
+    def scatter():
+        # Beyond MAX_POINTS regions, an even spread along the amount axis is drawn
+        region_growth = figures.thin_points(run_query(engine, 'chart_region_quarters', {'year': year}), 'total_amount')
+        return px.scatter(
+            region_growth,
+            x='total_amount',
+            y='growth_potential',
+            size='total_amount',
+            color='growth_potential',
+            hover_name='region',
+            color_continuous_scale='RdYlGn',
+            labels={'total_amount': 'Total Amount (₹)', 'growth_potential': 'Growth Potential'},
+            title='Region Growth Potential Analysis'
+        )
+    plot_cached(engine, ('Region Growth Potential Analysis', year), scatter)
 
 # Scenario 4: Top-performing locations
 def scenario_4():
@@ -381,68 +740,65 @@ def scenario_4():
     engine = get_engine()
     if not engine:
         return
-        
+    scenario_4_view(engine)
+
+# Changing the entity level reruns only this fragment
+@st.fragment
+def scenario_4_view(engine):
+    import plotly.express as px
+
     try:
         # Entity level selection
         entity_level = st.radio("Select Entity Level", ['state', 'district', 'pincode'], index=0, horizontal=True)
-        
-        with st.spinner("Loading top location data..."):
-            # Top locations query
-            query = text(f"""
-                SELECT entity_name, 
-                       SUM(count) as total_count, 
-                       SUM(amount) as total_amount
-                FROM top_transaction
-                WHERE entity_level = '{entity_level}'
-                GROUP BY entity_name
-                ORDER BY total_amount DESC
-                LIMIT 20
-            """)
-            
-            with engine.connect() as conn:
-                df = pd.read_sql(query, conn)
-                
+
+        with timed_section("Scenario 4"), st.spinner("Loading top location data..."):
+            # Top locations
+            locations = get_cubes(engine)['top_transaction'].slice(entity_level=entity_level)
+            df = locations.top_k('total_amount', 20, 'entity_name')
+
             # Metrics
             col1, col2 = st.columns(2)
             col1.metric("Total Transactions", f"{df['total_count'].sum():,}")
             col2.metric("Total Amount", f"₹{df['total_amount'].sum():,.2f}")
-            
+
             # Top locations
             st.subheader(f"Top 20 {entity_level.capitalize()}s by Transaction Amount")
             if not df.empty:
-                df = df.sort_values('total_amount', ascending=False)
-                
-                fig = px.bar(
-                    df,
-                    x='entity_name',
-                    y='total_amount',
-                    color='total_amount',
-                    color_continuous_scale='Viridis',
-                    labels={'total_amount': 'Amount (₹)', 'entity_name': entity_level.capitalize()},
-                    title=f'Top {entity_level.capitalize()}s by Transaction Value'
-                )
-                fig.update_layout(xaxis=dict(tickangle=45))
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Performance distribution
-            st.subheader("Performance Distribution")
-            if not df.empty:
-                fig = px.box(
-                    df,
-                    y='total_amount',
-                    points='all',
-                    labels={'total_amount': 'Amount (₹)'},
-                    title='Transaction Amount Distribution'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-            st.success("Top location analysis completed!")
-            
+                def location_bars():
+                    fig = px.bar(
+                        df,
+                        x='entity_name',
+                        y='total_amount',
+                        color='total_amount',
+                        color_continuous_scale='Viridis',
+                        labels={'total_amount': 'Amount (₹)', 'entity_name': entity_level.capitalize()},
+                        title=f'Top {entity_level.capitalize()}s by Transaction Value'
+                    )
+                    fig.update_layout(xaxis=dict(tickangle=45))
+                    return fig
+                plot_cached(engine, (f'Top {entity_level.capitalize()}s by Transaction Value', entity_level), location_bars)
+
+        # Performance distribution, built on demand
+        if not df.empty:
+            lazy_section("Performance Distribution", 'sc4_box', amount_distribution, engine, entity_level, df)
+
+        st.success("Top location analysis completed!")
+
     except Exception as e:
         st.error(f"Error in Scenario 4: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
+
+def amount_distribution(engine, entity_level, df):
+    import plotly.express as px
+
+    def box():
+        return px.box(
+            df,
+            y='total_amount',
+            points=figures.box_points(len(df)),
+            labels={'total_amount': 'Amount (₹)'},
+            title='Transaction Amount Distribution'
+        )
+    plot_cached(engine, ('Transaction Amount Distribution', entity_level), box)
 
 # Scenario 5: Top user registration locations
 def scenario_5():
@@ -450,74 +806,317 @@ def scenario_5():
     engine = get_engine()
     if not engine:
         return
-        
+
+    try:
+        # Filter options are read on full reruns only
+        year_quarters = filter_options(engine, 'rollup_top_user', 'period')['value'].tolist()[::-1]
+    except Exception as e:
+        st.error(f"Error in Scenario 5: {str(e)}")
+        return
+    scenario_5_view(engine, year_quarters)
+
+# Changing the period reruns only this fragment
+@st.fragment
+def scenario_5_view(engine, year_quarters):
+    import plotly.express as px
+
     try:
         # Year-quarter selection
-        with engine.connect() as conn:
-            year_quarters = pd.read_sql("""
-                SELECT DISTINCT CONCAT(year, ' Q', quarter) AS yq 
-                FROM top_user 
-            """, conn)['yq'].tolist()
-        
         selected_yq = st.selectbox("Select Year-Quarter", year_quarters, index=0)
         year, quarter = selected_yq.split(' Q')
-        
-        with st.spinner("Loading user registration data..."):
-            # Registration locations query
-            query = text(f"""
-                SELECT entity_level, entity_name, 
-                       SUM(registered_users) as total_users
-                FROM top_user
-                WHERE year = {year} AND quarter = {quarter}
-                GROUP BY entity_level, entity_name
-                ORDER BY total_users DESC
-                LIMIT 20
-            """)
-            
-            with engine.connect() as conn:
-                df = pd.read_sql(query, conn)
-                
+
+        with timed_section("Scenario 5"), st.spinner("Loading user registration data..."):
+            # Registration locations
+            period_users = get_cubes(engine)['top_user'].slice(year=int(year), quarter=int(quarter))
+            df = period_users.top_k('total_users', 20, 'entity_level', 'entity_name')
+
             # Metrics
             col1, col2 = st.columns(2)
             col1.metric("Total Registered Users", f"{df['total_users'].sum():,}")
             col2.metric("Locations Covered", df['entity_name'].nunique())
-            
+
             # Top locations
             st.subheader(f"Top 20 Registration Locations ({selected_yq})")
             if not df.empty:
-                df = df.sort_values('total_users', ascending=False)
-                
-                fig = px.bar(
-                    df,
-                    x='entity_name',
-                    y='total_users',
-                    color='entity_level',
-                    labels={'total_users': 'Registered Users', 'entity_name': 'Location'},
-                    title='Top Registration Locations'
-                )
-                fig.update_layout(xaxis=dict(tickangle=45))
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Geographical distribution
-            st.subheader("Geographical Distribution")
-            if not df.empty:
-                fig = px.treemap(
-                    df,
-                    path=['entity_level', 'entity_name'],
-                    values='total_users',
-                    color='total_users',
-                    color_continuous_scale='RdBu',
-                    title='User Registration Distribution'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-            st.success("User registration analysis completed!")
-            
+                def location_bars():
+                    fig = px.bar(
+                        df,
+                        x='entity_name',
+                        y='total_users',
+                        color='entity_level',
+                        labels={'total_users': 'Registered Users', 'entity_name': 'Location'},
+                        title='Top Registration Locations'
+                    )
+                    fig.update_layout(xaxis=dict(tickangle=45))
+                    return fig
+                plot_cached(engine, ('Top Registration Locations', selected_yq), location_bars)
+
+        # Geographical distribution, built on demand
+        if not df.empty:
+            lazy_section("Geographical Distribution", 'sc5_treemap', registration_treemap, engine, selected_yq, df)
+
+        st.success("User registration analysis completed!")
+
     except Exception as e:
         st.error(f"Error in Scenario 5: {str(e)}")
-    finally:
-        if engine:
-            engine.dispose()
+
+def registration_treemap(engine, period, df):
+    import plotly.express as px
+
+    def treemap():
+        return px.treemap(
+            df,
+            path=['entity_level', 'entity_name'],
+            values='total_users',
+            color='total_users',
+            color_continuous_scale='RdBu',
+            title='User Registration Distribution'
+        )
+    plot_cached(engine, ('User Registration Distribution', period), treemap)
+
+# Map zoom level -> side of a density-map bin, in grid cells. One step of zoom
+# halves the bin, so a bin stays roughly the same size on screen.
+GRID_ZOOM_LEVELS = {zoom: 2 ** max(0, 8 - zoom) for zoom in range(3, 11)}
+# Bins sent to the browser at most; grid_bins makes the bins coarser than the zoom
+# level's until they fit, and only truncates beyond 32x
+GRID_MAX_BINS = 5000
+# The map opens at this zoom level, per scope
+GRID_DEFAULT_ZOOM = {'country': 4, 'state': 6}
+
+def grid_queries(scope, parent_state, year, quarter, zoom):
+    """The map's two queries for one region, period and zoom level, as (name, params): bins, then metadata."""
+    params = {'scope': scope, 'year': year, 'quarter': quarter, 'parent_state': parent_state}
+    return [('grid_bins', dict(params, bin_cells=GRID_ZOOM_LEVELS[zoom], max_bins=GRID_MAX_BINS)),
+            ('grid_meta', params)]
+
+def density_map(df, **kwargs):
+    import plotly.express as px
+
+    # Plotly 5.24+ draws tile maps with MapLibre (density_map); older releases only have density_mapbox
+    if hasattr(px, 'density_map'):
+        return px.density_map(df, map_style='open-street-map', **kwargs)
+    return px.density_mapbox(df, mapbox_style='open-street-map', **kwargs)
+
+# Scenario 6: Insurance density map
+def scenario_6():
+    st.header("🗺️ Scenario 6: Insurance Density Map")
+    engine = get_engine()
+    if not engine:
+        return
+
+    try:
+        # Filter options are read on full reruns only
+        states = filter_options(engine, 'map_insurance_grid_meta', 'state')['value'].tolist()
+    except Exception as e:
+        st.error(f"Error in Scenario 6: {str(e)}")
+        return
+    scenario_6_view(engine, states)
+
+# Changing the region, period or zoom reruns only this fragment
+@st.fragment
+def scenario_6_view(engine, states):
+    try:
+        # Scope and period selection
+        col1, col2, col3 = st.columns(3)
+        selected_state = col1.selectbox("Select Region", ["All India"] + [s.title() for s in states], key='sc6_state')
+        if selected_state == "All India":
+            scope, parent_state = 'country', ''
+        else:
+            scope, parent_state = 'state', states[[s.title() for s in states].index(selected_state)]
+
+        # Not every period has a country-level file, so list the ones this region has
+        year_quarters = filter_options(engine, 'map_insurance_grid_meta', 'period', parent_state)['value'].tolist()[::-1]
+        selected_yq = col2.selectbox("Select Year-Quarter", year_quarters, index=0, key='sc6_period')
+        zoom = col3.select_slider("Zoom Level", options=list(GRID_ZOOM_LEVELS),
+                                  value=GRID_DEFAULT_ZOOM[scope], key='sc6_zoom')
+        year, quarter = (int(v) for v in selected_yq.split(' Q'))
+        bin_cells = GRID_ZOOM_LEVELS[zoom]
+
+        with timed_section("Scenario 6"), st.spinner("Binning insurance grid..."), concurrent_queries(engine) as submit:
+            # Points are summed into bins of bin_cells x bin_cells grid cells in the database
+            bins_query, meta_query = grid_queries(scope, parent_state, year, quarter, zoom)
+            bins_future = submit(*bins_query)
+            meta_df = submit(*meta_query).result()
+            bins_df = bins_future.result()
+
+            # Metrics; the bins may be coarser than the zoom level asked for
+            raw_points = int(meta_df['points'].sum()) if not meta_df.empty else 0
+            if not bins_df.empty:
+                bin_cells, total_bins = int(bins_df['bin_cells'].iloc[0]), int(bins_df['total_bins'].iloc[0])
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Grid Points", f"{raw_points:,}")
+            col2.metric("Bins Sent to Browser", f"{len(bins_df):,}")
+            col3.metric("Bin Size", f"{bin_cells / GRID_CELLS_PER_DEGREE:.2f}°")
+
+            st.subheader(f"Insurance Density ({selected_state}, {selected_yq})")
+            if not bins_df.empty:
+                def density():
+                    fig = density_map(
+                        bins_df,
+                        lat='lat',
+                        lon='lng',
+                        z='policies',
+                        radius=12,
+                        center=dict(lat=bins_df['lat'].mean(), lon=bins_df['lng'].mean()),
+                        zoom=zoom,
+                        hover_data={'points': True},
+                        title='Insurance Policies by Grid Bin'
+                    )
+                    fig.update_layout(height=650, margin=dict(l=0, r=0, t=40, b=0))
+                    return fig
+                plot_cached(engine, ('Insurance Policies by Grid Bin', scope, parent_state, year, quarter, zoom), density)
+                note = f"{raw_points:,} points binned server-side into {total_bins:,} bins."
+                if bin_cells > GRID_ZOOM_LEVELS[zoom]:
+                    note += (f" Bins are {bin_cells // GRID_ZOOM_LEVELS[zoom]}x coarser than this zoom level's, "
+                             f"to stay within {GRID_MAX_BINS:,}.")
+                if total_bins > len(bins_df):
+                    note += (f" Only the {len(bins_df):,} bins with the most policies are drawn "
+                             f"({int(bins_df['points'].sum()):,} of the points).")
+                if raw_points > len(bins_df):
+                    st.caption(note)
+
+            # Percentiles shipped with the source file
+            if not meta_df.empty:
+                with st.expander("Point Metric Percentiles"):
+                    st.dataframe(meta_df.drop(columns='points').rename(columns=lambda c: c[1:].replace('_', '.') + '%'),
+                                 use_container_width=True, hide_index=True)
+
+            st.success("Insurance density analysis completed!")
+
+    except Exception as e:
+        st.error(f"Error in Scenario 6: {str(e)}")
+
+# Scenario 7: Device brand share
+# Brands outside the top ones of the selected quarter are shown as one "Others" band
+BRAND_TREND_TOP = 8
+
+def scenario_7():
+    st.header("📲 Scenario 7: Device Brand Share")
+    engine = get_engine()
+    if not engine:
+        return
+
+    try:
+        # Filter options are read on full reruns only
+        year_quarters = filter_options(engine, 'rollup_device_brand', 'period')['value'].tolist()[::-1]
+    except Exception as e:
+        st.error(f"Error in Scenario 7: {str(e)}")
+        return
+    if not year_quarters:
+        st.info("No device brand data has been loaded.")
+        return
+    scenario_7_view(engine, year_quarters)
+
+# Changing the period reruns only this fragment
+@st.fragment
+def scenario_7_view(engine, year_quarters):
+    import plotly.express as px
+
+    try:
+        # Year-quarter selection (the source files only break users down by device up to 2022)
+        selected_yq = st.selectbox("Select Year-Quarter", year_quarters, index=0, key='sc7_period')
+        year, quarter = (int(v) for v in selected_yq.split(' Q'))
+
+        with timed_section("Scenario 7"), st.spinner("Loading device brand data..."):
+            # Registered users per brand in the quarter, sliced from the cube
+            brands = get_cubes(engine)['device_brand']
+            df = brands.slice(year=year, quarter=quarter).top_k('total_users', len(brands.labels['brand']), 'brand')
+            total_users = df['total_users'].sum()
+            df['share'] = df['total_users'] / total_users if total_users else 0.0
+
+            # Metrics
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Users by Device", f"{total_users:,}")
+            col2.metric("Brands", len(df))
+            if not df.empty:
+                col3.metric("Leading Brand", f"{df['brand'].iloc[0]} ({df['share'].iloc[0]:.1%})")
+
+            # Brand share
+            st.subheader(f"Device Brand Share ({selected_yq})")
+            if not df.empty:
+                def brand_bars():
+                    fig = px.bar(
+                        df,
+                        x='brand',
+                        y='share',
+                        color='share',
+                        color_continuous_scale='Blues',
+                        hover_data={'total_users': ':,'},
+                        labels={'share': 'Share of Users', 'brand': 'Brand', 'total_users': 'Users'},
+                        title='Registered Users by Device Brand'
+                    )
+                    fig.update_layout(yaxis=dict(tickformat='.0%'), xaxis=dict(tickangle=45))
+                    return fig
+                plot_cached(engine, ('Registered Users by Device Brand', selected_yq), brand_bars)
+
+        # Share over time, built on demand
+        if not df.empty:
+            lazy_section("Brand Share Over Time", 'sc7_trend', brand_share_trend,
+                         engine, selected_yq, brands, df['brand'].head(BRAND_TREND_TOP).tolist())
+
+        st.success("Device brand analysis completed!")
+
+    except Exception as e:
+        st.error(f"Error in Scenario 7: {str(e)}")
+
+def brand_share_trend(engine, period, brands, top_brands):
+    import plotly.express as px
+
+    def share_areas():
+        trend_df = brands.rollup('year', 'quarter', 'brand').to_frame()
+        trend_df['brand'] = trend_df['brand'].astype(str).where(trend_df['brand'].isin(top_brands), figures.OTHERS)
+        trend_df = trend_df.groupby(['year', 'quarter', 'brand'], as_index=False)['total_users'].sum()
+        trend_df['share'] = trend_df['total_users'] / trend_df.groupby(['year', 'quarter'])['total_users'].transform('sum')
+        trend_df['period'] = trend_df['year'].astype(str) + ' Q' + trend_df['quarter'].astype(str)
+        fig = px.area(
+            trend_df,
+            x='period',
+            y='share',
+            color='brand',
+            category_orders={'brand': top_brands + [figures.OTHERS]},
+            labels={'share': 'Share of Users', 'period': 'Quarter', 'brand': 'Brand'},
+            title='Device Brand Share by Quarter'
+        )
+        fig.update_layout(yaxis=dict(tickformat='.0%'), xaxis=dict(tickangle=45))
+        return fig
+    plot_cached(engine, ('Device Brand Share by Quarter', period), share_areas)
+
+# Prefetch: every filter combination whose results come from the database
+# rather than the cubes, loaded in the background once per data generation
+# (prefetch.py). Its results are kept for the whole generation, not the cache
+# TTL; [cache] prefetch_workers in secrets.toml sets how many run at once.
+PREFETCH_TTL = float('inf')
+
+def prefetch_jobs(engine):
+    """(scenario, name, params) of Scenario 3's regional charts per year and Scenario 6's map per region and period."""
+    jobs = [("Scenario 3", 'chart_region_quarters', {'year': year})
+            for year in filter_years(engine, 'rollup_transaction_category')]
+    states = filter_options(engine, 'map_insurance_grid_meta', 'state')['value'].tolist()
+    for parent_state in [''] + states:
+        scope = 'state' if parent_state else 'country'
+        # A state's map opens at its own default zoom, or at the country's when
+        # the slider keeps its value from All India
+        zooms = sorted({GRID_DEFAULT_ZOOM[scope], GRID_DEFAULT_ZOOM['country']})
+        periods = filter_options(engine, 'map_insurance_grid_meta', 'period', parent_state)
+        for year, quarter in zip(periods['year'], periods['quarter']):
+            for zoom in zooms:
+                bins_query, meta_query = grid_queries(scope, parent_state, int(year), int(quarter), zoom)
+                jobs.append(("Scenario 6", *bins_query))
+            jobs.append(("Scenario 6", *meta_query))
+    return jobs
+
+def start_prefetch():
+    """Start this data generation's prefetch on the first full page run that sees it."""
+    try:
+        engine = create_shared_engine()
+        cache = get_query_cache()
+        generation = cache.generation(lambda: fetch_generation(engine))
+        workers = secrets_section("cache").get('prefetch_workers', max(1, engine.pool.size() // 2))
+        return prefetch.start(generation, lambda: prefetch_jobs(engine),
+                              lambda name, params: cached_query(cache, engine, name, params, PREFETCH_TTL), workers)
+    except Exception:
+        # The scenarios report a database that cannot be reached
+        return None
 
 # Streamlit app configuration
 st.set_page_config(
@@ -527,6 +1126,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Full runs of the page are timed for comparison with fragment reruns (see timed_section)
+page_start = time.perf_counter()
+configure_perf_log()
+
 # Main dashboard
 st.title("📱 PhonePe Data Analysis Dashboard")
 st.markdown("""
@@ -539,13 +1142,24 @@ with st.sidebar:
     st.header("Database Status")
     if st.button("Test Database Connection"):
         test_db()
+    with st.expander("Connection Pool"):
+        show_pool_status()
+    with st.expander("Query Cache"):
+        show_cache_status()
+    with st.expander("Data Cube"):
+        show_cube_status()
+    with st.expander("Query Timings"):
+        show_query_stats()
+    if st.toggle("Performance panel", key='perf_panel'):
+        with st.expander("Performance", expanded=True):
+            show_performance()
     
     st.divider()
     
     st.header("Analysis Scenarios")
     scenario = st.selectbox(
         "Select Analysis Scenario",
-        ["Scenario 1", "Scenario 2", "Scenario 3", "Scenario 4", "Scenario 5"]
+        ["Scenario 1", "Scenario 2", "Scenario 3", "Scenario 4", "Scenario 5", "Scenario 6", "Scenario 7"]
     )
     
     st.divider()
@@ -560,14 +1174,23 @@ with st.sidebar:
     st.divider()
     st.caption("PhonePe Data Analysis | v1.0 | 2025")
 
+start_prefetch()
+
 # Execute selected scenario
-if scenario == "Scenario 1":
-    scenario_1()
-elif scenario == "Scenario 2":
-    scenario_2()
-elif scenario == "Scenario 3":
-    scenario_3()
-elif scenario == "Scenario 4":
-    scenario_4()
-elif scenario == "Scenario 5":
-    scenario_5()
\ No newline at end of file
+with perf.tagged(session=perf_session()):
+    if scenario == "Scenario 1":
+        scenario_1()
+    elif scenario == "Scenario 2":
+        scenario_2()
+    elif scenario == "Scenario 3":
+        scenario_3()
+    elif scenario == "Scenario 4":
+        scenario_4()
+    elif scenario == "Scenario 5":
+        scenario_5()
+    elif scenario == "Scenario 6":
+        scenario_6()
+    elif scenario == "Scenario 7":
+        scenario_7()
+
+st.session_state['page_run_ms'] = (time.perf_counter() - page_start) * 1000
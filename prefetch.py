@@ -0,0 +1,100 @@
+"""Precompute the query results behind every filter combination of the dashboard.
+
+Scenarios 1, 2, 4, 5 and 7 (and Scenario 3's category trends) are sliced
+from cube.py's cubes, which are read whole once per data generation, so
+any year, year range, entity level or period costs them no query. What
+still reaches the database is Scenario 3's regional charts, one query per
+year, and Scenario 6's map, one query per region, period and zoom level and
+one per region and period. The filter space of both is small and known from
+``filter_metadata``; the map is prefetched at the zoom levels it opens at.
+
+The dashboard calls ``start(generation, jobs, load, workers)`` on every full
+page run, with ``jobs()`` listing the ``(scenario, name, params)`` of every
+one of those combinations. The first call for a data generation (the first page
+run after a server start or after load_sql.py wrote a new load) runs
+``load(name, params)`` for every job in the background, on ``workers``
+threads, so the results land in the shared query cache before an analyst
+picks them. Later calls for the same generation return the same run.
+``latest()`` reports its coverage and timing, and the report is also
+printed to stderr once the run has finished.
+"""
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_lock = threading.Lock()
+_runs = {}  # generation -> Run; only the latest generation's is kept
+
+
+class Run:
+    """One generation's prefetch: how many results are loaded, per scenario, and how long it took."""
+
+    def __init__(self, generation, jobs, workers):
+        self.generation = generation
+        self.jobs = jobs
+        self.workers = workers
+        self.done = {}  # scenario -> [loaded, total]
+        for scenario, _, _ in jobs:
+            self.done.setdefault(scenario, [0, 0])[1] += 1
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.finished = threading.Event()
+
+    def execute(self, load):
+        def prefetch(job):
+            scenario, name, params = job
+            try:
+                load(name, params)
+            except Exception as e:
+                with _lock:
+                    self.errors.append(f"{scenario} {name} {params}: {e}")
+                return
+            with _lock:
+                self.done[scenario][0] += 1
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prefetch') as pool:
+            list(pool.map(prefetch, self.jobs))
+        self.seconds = time.perf_counter() - self.started
+        self.finished.set()
+        print(self.report(), file=sys.stderr)
+
+    def status(self):
+        """Coverage so far: loaded and total results, overall and per scenario."""
+        with _lock:
+            done = {scenario: tuple(counts) for scenario, counts in self.done.items()}
+        return {
+            'generation': self.generation,
+            'loaded': sum(loaded for loaded, _ in done.values()),
+            'total': len(self.jobs),
+            'scenarios': done,
+            'errors': len(self.errors),
+            'seconds': self.seconds if self.seconds is not None else time.perf_counter() - self.started,
+            'finished': self.finished.is_set(),
+        }
+
+    def report(self):
+        status = self.status()
+        lines = [f"Prefetch: {status['loaded']:,}/{status['total']:,} query results for data generation "
+                 f"{status['generation']} in {status['seconds']:.1f}s ({self.workers} workers)"]
+        lines += [f"  {scenario}: {loaded:,}/{total:,}" for scenario, (loaded, total) in status['scenarios'].items()]
+        lines += [f"  {error}" for error in self.errors]
+        return '\n'.join(lines)
+
+
+def start(generation, jobs, load, workers=2):
+    """Start prefetching ``jobs()`` for ``generation`` unless that is already done or under way; return its Run."""
+    with _lock:
+        run = _runs.get(generation)
+        if run is not None:
+            return run
+        _runs.clear()
+        run = _runs[generation] = Run(generation, list(jobs()), workers)
+    threading.Thread(target=run.execute, args=(load,), name='prefetch', daemon=True).start()
+    return run
+
+def latest():
+    """The latest generation's Run, or None before the first page run."""
+    with _lock:
+        return next(iter(_runs.values()), None)
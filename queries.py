@@ -0,0 +1,201 @@
+"""Named, parameterized SQL statements used by the dashboard.
+
+The dashboard runs its SQL through ``execute(conn, name, params)`` instead
+of formatting filter values into the query text. The statement text is the
+same for every filter value, so SQLAlchemy compiles each statement once and
+reuses it from its compiled cache, and user input never becomes SQL.
+
+PyMySQL (and DuckDB through duckdb-engine) have no client API for server-side
+prepared statements, so statements are re-sent per execution. Keeping the text
+fixed is what lets the server and the query cache recognise repeats.
+
+``execute`` also times every statement; ``stats()`` reports the totals, and
+perf.py records the SQL and the DataFrame construction as separate stages. Its
+DataFrames are compacted: text columns become ``category`` dtype and numeric
+columns are downcast to the smallest dtype that holds every value exactly.
+"""
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql
+
+import perf
+
+STATEMENTS = {
+    'load_generation': text("SELECT MAX(id) AS generation FROM load_generation"),
+
+    # Every widget's options, written by load_sql.py at the end of each load; read once per data generation
+    'filter_metadata': text("""
+        SELECT dataset, kind, parent_state, value, year, quarter, row_count
+        FROM filter_metadata
+        ORDER BY dataset, kind, parent_state, year, quarter, value
+    """),
+
+    # Scenarios 1-5 and 7 read the rollup tables whole, once per data generation, into cube.py's cubes
+    'cube_transaction_category': text("""
+        SELECT year, quarter, category, total_count, total_amount
+        FROM rollup_transaction_category
+    """),
+    'cube_transaction_region': text("""
+        SELECT year, quarter, name AS state, total_count, total_amount
+        FROM rollup_transaction_region
+    """),
+    'cube_insurance_period': text("""
+        SELECT year, quarter, total_policies, total_premium
+        FROM rollup_insurance_period
+    """),
+    'cube_insurance_region': text("""
+        SELECT year, quarter, name AS state, total_policies, total_premium
+        FROM rollup_insurance_region
+    """),
+    'cube_top_user': text("""
+        SELECT year, quarter, entity_level, entity_name, total_users
+        FROM rollup_top_user
+    """),
+    'cube_top_transaction': text("""
+        SELECT entity_level, entity_name, total_count, total_amount
+        FROM rollup_top_transaction
+    """),
+    'cube_device_brand': text("""
+        SELECT year, quarter, brand, total_users
+        FROM rollup_device_brand
+    """),
+
+    # Scenario 3's heatmap and scatter: one row per region with its amount in
+    # each quarter (the heatmap's pivot, by conditional aggregation) and the
+    # percentile rank of its yearly total (window functions), so it returns
+    # only the rows the charts draw. Tied totals share the average of their
+    # ranks, as pandas' rank(pct=True) gives them: the mean of RANK()/n (the
+    # lowest) and CUME_DIST() (the highest). check_charts.py checks it against
+    # the cube path, and benchmark.py times it against it.
+    'chart_region_quarters': text("""
+        SELECT name AS region,
+               SUM(CASE WHEN quarter = 1 THEN total_amount ELSE 0 END) AS q1,
+               SUM(CASE WHEN quarter = 2 THEN total_amount ELSE 0 END) AS q2,
+               SUM(CASE WHEN quarter = 3 THEN total_amount ELSE 0 END) AS q3,
+               SUM(CASE WHEN quarter = 4 THEN total_amount ELSE 0 END) AS q4,
+               SUM(total_amount) AS total_amount,
+               (RANK() OVER (ORDER BY SUM(total_amount)) * 1.0 / COUNT(*) OVER ()
+                + CUME_DIST() OVER (ORDER BY SUM(total_amount))) / 2 AS growth_potential
+        FROM rollup_transaction_region
+        WHERE year = :year
+        GROUP BY name
+        ORDER BY name
+    """),
+
+    # Scenario 6: insurance grid
+    # Points summed into bins of bin_cells x bin_cells grid cells, each placed
+    # at its metric-weighted centre. If that makes more than :max_bins bins,
+    # the bins are made coarser (2x, 4x, ... up to 32x the cells) until they
+    # fit, and the size used is returned as bin_cells. total_bins is the bin
+    # count before the LIMIT, so a map still truncated at 32x can say so.
+    # The bin key packs (bin_y, bin_x) into one number; |cell_x| stays under
+    # 100000 (180 degrees x GRID_CELLS_PER_DEGREE).
+    'grid_bins': text("""
+        WITH points AS (
+            SELECT cell_x, cell_y, lat, lng, metric
+            FROM map_insurance_grid
+            WHERE scope = :scope AND year = :year AND quarter = :quarter AND parent_state = :parent_state AND metric > 0
+        ),
+        sizes AS (
+            SELECT :bin_cells AS bin_cells UNION ALL SELECT :bin_cells * 2 UNION ALL SELECT :bin_cells * 4
+            UNION ALL SELECT :bin_cells * 8 UNION ALL SELECT :bin_cells * 16 UNION ALL SELECT :bin_cells * 32
+        ),
+        chosen AS (
+            SELECT COALESCE(MIN(CASE WHEN bins <= :max_bins THEN bin_cells END), MAX(bin_cells)) AS bin_cells
+            FROM (
+                SELECT s.bin_cells,
+                       COUNT(DISTINCT FLOOR(p.cell_y / s.bin_cells) * 100000 + FLOOR(p.cell_x / s.bin_cells)) AS bins
+                FROM sizes s CROSS JOIN points p
+                GROUP BY s.bin_cells
+            ) counts
+        )
+        SELECT FLOOR(p.cell_y / c.bin_cells) AS bin_y,
+               FLOOR(p.cell_x / c.bin_cells) AS bin_x,
+               SUM(p.lat * p.metric) / SUM(p.metric) AS lat,
+               SUM(p.lng * p.metric) / SUM(p.metric) AS lng,
+               SUM(p.metric) AS policies,
+               COUNT(*) AS points,
+               c.bin_cells,
+               COUNT(*) OVER () AS total_bins
+        FROM points p CROSS JOIN chosen c
+        GROUP BY FLOOR(p.cell_y / c.bin_cells), FLOOR(p.cell_x / c.bin_cells), c.bin_cells
+        ORDER BY policies DESC
+        LIMIT :max_bins
+    """),
+    'grid_meta': text("""
+        SELECT points, p10, p20, p30, p40, p50, p60, p80, p90, p99_5
+        FROM map_insurance_grid_meta
+        WHERE scope = :scope AND year = :year AND quarter = :quarter AND parent_state = :parent_state
+    """),
+}
+
+_lock = threading.Lock()
+_stats = {}  # name -> [calls, rows, total seconds, max seconds]
+
+def statement(name):
+    return STATEMENTS[name]
+
+def execute(conn, name, params=None):
+    """Run statement ``name`` on ``conn`` with bound ``params`` and return a DataFrame."""
+    start = time.perf_counter()
+    # What pd.read_sql does, in two steps so perf.py can tell the database from pandas
+    with perf.stage('sql', name) as sql:
+        result = conn.execute(STATEMENTS[name], params or {})
+        columns, rows = list(result.keys()), result.fetchall()
+        sql['rows'] = len(rows)
+    with perf.stage('frame', name) as frame:
+        df = compact(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
+        frame['rows'], frame['bytes'] = len(df), int(df.memory_usage(deep=True).sum())
+    elapsed = time.perf_counter() - start
+    with _lock:
+        entry = _stats.setdefault(name, [0, 0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += len(df)
+        entry[2] += elapsed
+        entry[3] = max(entry[3], elapsed)
+    return df
+
+def compact(df):
+    """Shrink ``df`` in place: text to ``category``, numbers to their smallest exact dtype."""
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            kind = pd.api.types.infer_dtype(values, skipna=True)
+            if kind == 'string':
+                df[column] = values.astype('category')
+            elif kind == 'decimal':
+                # MySQL returns SUM() of an integer column as DECIMAL
+                df[column] = pd.to_numeric(values)
+                values = df[column]
+        if values.dtype.kind == 'i':
+            df[column] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype.kind == 'u':
+            df[column] = pd.to_numeric(values, downcast='unsigned')
+        elif values.dtype.kind == 'f':
+            narrow = values.astype(np.float32)
+            if np.array_equal(narrow.to_numpy(), values.to_numpy(), equal_nan=True):
+                df[column] = narrow
+    return df
+
+def stats():
+    """Executions per statement (cache hits never reach ``execute``), slowest total first."""
+    with _lock:
+        rows = [
+            {'statement': name, 'calls': calls, 'rows': rows, 'total_ms': total * 1000,
+             'avg_ms': total * 1000 / calls, 'max_ms': worst * 1000}
+            for name, (calls, rows, total, worst) in _stats.items()
+        ]
+    return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+def positional(name, params=None):
+    """``(sql, args)`` for DB-API drivers with ``%s`` placeholders, such as mysql.connector."""
+    stmt = STATEMENTS[name]
+    if params:
+        stmt = stmt.bindparams(**params)
+    compiled = stmt.compile(dialect=mysql.dialect(paramstyle='format'),
+                            compile_kwargs={'render_postcompile': True})
+    return str(compiled), tuple(compiled.params[key] for key in compiled.positiontup)
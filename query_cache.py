@@ -0,0 +1,145 @@
+"""Process-wide cache for dashboard query results.
+
+Entries are keyed on the normalized SQL text plus its bound parameters,
+expire after a TTL, and are evicted least-recently-used once the cached
+DataFrames exceed a memory budget. Each entry also records the data
+generation it was read under (the latest ``load_generation`` row written
+by load_sql.py), so a new load invalidates everything cached before it.
+Concurrent misses on the same key share one load: the first caller runs
+it and the others wait for its result.
+"""
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_sql(sql):
+    return ' '.join(str(sql).split())
+
+def cache_key(sql, params=None):
+    items = []
+    for name, value in sorted((params or {}).items()):
+        if isinstance(value, (list, set)):
+            value = tuple(value)
+        items.append((name, value))
+    return normalize_sql(sql), tuple(items)
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class QueryCache:
+    """LRU + TTL cache of DataFrames, bounded by ``max_bytes``.
+
+    ``size`` measures an entry; pass another one to cache values that are
+    not DataFrames (the dashboard's figure cache sizes its figures by payload).
+    """
+
+    def __init__(self, ttl=600, max_bytes=256 * 1024 * 1024, generation_ttl=15, size=frame_bytes):
+        self.ttl = ttl
+        self.size = size
+        self.max_bytes = max_bytes
+        self.generation_ttl = generation_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (df, nbytes, expires_at, generation)
+        self.loading = {}  # (key, generation) -> Future of the load under way
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self._generation = None
+        self._generation_checked = 0.0
+
+    def generation(self, fetch):
+        """Current data generation, re-read with ``fetch()`` at most every ``generation_ttl`` seconds.
+
+        If ``fetch()`` fails, the last known generation is kept (and retried
+        after ``generation_ttl``), so a brief database error does not empty
+        the cache. It raises only while no generation is known yet.
+        """
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked > self.generation_ttl:
+            try:
+                generation = fetch()
+            except Exception:
+                if self._generation is None:
+                    raise
+                self._generation_checked = now
+                return self._generation
+            with self.lock:
+                if generation != self._generation:
+                    self._clear()
+                self._generation = generation
+                self._generation_checked = now
+        return self._generation
+
+    def get_or_load(self, key, load, generation, ttl=None):
+        """The cached value for ``key``, else ``load()``'s, kept for ``ttl`` seconds (default: the cache's)."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > now and entry[3] == generation:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                self._drop(key)
+            flight = self.loading.get((key, generation))
+            leader = flight is None
+            if leader:
+                flight = self.loading[(key, generation)] = Future()
+                self.misses += 1
+            else:
+                self.shared += 1
+        if not leader:
+            # Another caller is loading this key; wait for its result (or its error)
+            return flight.result()
+
+        try:
+            df = load()
+            nbytes = self.size(df)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[(key, generation)]
+            flight.set_exception(e)
+            raise
+        with self.lock:
+            if nbytes <= self.max_bytes:
+                if key in self.entries:
+                    self._drop(key)
+                self.entries[key] = (df, nbytes, now + (self.ttl if ttl is None else ttl), generation)
+                self.bytes += nbytes
+                while self.bytes > self.max_bytes:
+                    self._drop(next(iter(self.entries)))
+                    self.evictions += 1
+            del self.loading[(key, generation)]
+        flight.set_result(df)
+        return df
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared': self.shared,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'generation': self._generation,
+            }
+
+    def _drop(self, key):
+        _, nbytes, _, _ = self.entries.pop(key)
+        self.bytes -= nbytes
+
+    def _clear(self):
+        self.entries.clear()
+        self.bytes = 0
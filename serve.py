@@ -0,0 +1,77 @@
+"""Start the dashboard with its caches already warm.
+
+``python serve.py [streamlit run options]`` is a drop-in for
+``streamlit run phonepe_dashboard.py``. Before the server starts listening it
+runs the dashboard in-process, through Streamlit's AppTest, once for the
+default view of every scenario. That fills everything the server process
+shares between sessions: the imports, the engine with its pool of open
+connections, the data cubes and filter options, the query cache with
+Scenario 6's default view, every default view's figures, and Plotly's
+per-chart-type setup. The first page run also starts the prefetch of every
+filter combination's query results (prefetch.py), and the server only starts
+once that has finished too. The first visitor after a deploy or restart then
+gets a page as fast as a warm one, whichever filters they pick.
+"""
+import os
+import sys
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phonepe_dashboard.py')
+SCENARIO_PICKER = "Select Analysis Scenario"
+
+
+def visit_scenarios(secrets=None, timeout=300):
+    """Open one new session and show each scenario's default view.
+
+    Returns ``({scenario: ms}, errors)``. ``secrets`` replaces
+    .streamlit/secrets.toml when given.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(SCRIPT, default_timeout=timeout)
+    if secrets:
+        app.secrets.update(secrets)
+    timings, errors = {}, []
+    start = time.perf_counter()
+    app.run()
+    picker = next(widget for widget in app.sidebar.selectbox if widget.label == SCENARIO_PICKER)
+    scenarios = list(picker.options)
+    for i, scenario in enumerate(scenarios):
+        if i:
+            start = time.perf_counter()
+            picker.set_value(scenario).run()
+            picker = next(widget for widget in app.sidebar.selectbox if widget.label == SCENARIO_PICKER)
+        timings[scenario] = (time.perf_counter() - start) * 1000
+        errors += [f"{scenario}: {element.value}" for element in list(app.error) + list(app.exception)]
+    return timings, errors
+
+def warm_up(secrets=None, prefetch_timeout=600):
+    """``visit_scenarios`` for its side effects, then wait for the prefetch it started.
+
+    A failure is reported, not raised. The prefetch prints its own coverage.
+    """
+    import prefetch
+
+    start = time.perf_counter()
+    try:
+        timings, errors = visit_scenarios(secrets)
+    except Exception as e:
+        timings, errors = {}, [str(e)]
+    run = prefetch.latest()
+    if run and not run.finished.wait(prefetch_timeout):
+        errors.append(f"prefetch still running after {prefetch_timeout}s: {run.report().splitlines()[0]}")
+    seconds = time.perf_counter() - start
+    print(f"Warm-up: {len(timings)} scenarios in {seconds:.1f}s", file=sys.stderr)
+    for error in errors:
+        print(f"  {error}", file=sys.stderr)
+    return seconds, errors
+
+def main():
+    from streamlit.web import cli
+
+    warm_up()
+    sys.argv = ['streamlit', 'run', SCRIPT] + sys.argv[1:]
+    sys.exit(cli.main())
+
+if __name__ == '__main__':
+    main()
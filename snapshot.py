@@ -0,0 +1,277 @@
+"""Columnar snapshot of the PhonePe Pulse tables (DuckDB or Parquet).
+
+``python load_sql.py --snapshot phonepe.duckdb`` loads the JSON files into a
+single DuckDB file, and ``--snapshot some_dir/`` writes one Parquet file per
+table instead; neither needs a MySQL server. Setting ``path`` in the
+``[snapshot]`` section of secrets.toml makes phonepe_dashboard.py query the
+snapshot through the same SQLAlchemy code path it uses for MySQL.
+
+The fact tables are partitioned the way DB_Creation.sql partitions them in
+MySQL, by scope and year: in a DuckDB file their rows are stored sorted on
+(scope, year, quarter), so the per-row-group min/max statistics skip every
+other period, and in a Parquet snapshot each of them is a hive-partitioned
+directory (``table/scope=country/year=2023/*.parquet``).
+"""
+import os
+
+import duckdb
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+import load_sql
+
+# DuckDB version of DB_Creation.sql (no indexes: scans are vectorized and columnar)
+SCHEMA = """
+CREATE TABLE load_manifest (
+    id INTEGER, path VARCHAR, dataset VARCHAR, size BIGINT, mtime DOUBLE,
+    content_hash VARCHAR, row_count INTEGER, loaded_at TIMESTAMP DEFAULT current_timestamp
+);
+CREATE TABLE load_generation (
+    id INTEGER, loaded_at TIMESTAMP DEFAULT current_timestamp, files_loaded INTEGER, rows_loaded BIGINT
+);
+CREATE TABLE dim_region (id USMALLINT, value VARCHAR);
+CREATE TABLE dim_category (id USMALLINT, value VARCHAR);
+CREATE TABLE dim_instrument_type (id USMALLINT, value VARCHAR);
+CREATE TABLE dim_metric_type (id USMALLINT, value VARCHAR);
+CREATE TABLE dim_entity (id UINTEGER, value VARCHAR);
+CREATE TABLE dim_brand (id USMALLINT, value VARCHAR);
+CREATE TABLE map_transaction_hover (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    name_id USMALLINT, metric_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE map_insurance_hover (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    name_id USMALLINT, metric_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE map_insurance_grid (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year SMALLINT, quarter TINYINT, cell_x SMALLINT, cell_y SMALLINT,
+    lat DOUBLE, lng DOUBLE, metric UINTEGER, label VARCHAR
+);
+CREATE TABLE map_insurance_grid_meta (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER, data_level VARCHAR, grid_level INTEGER,
+    points INTEGER, p10 DOUBLE, p20 DOUBLE, p30 DOUBLE, p40 DOUBLE, p50 DOUBLE, p60 DOUBLE, p80 DOUBLE,
+    p90 DOUBLE, p99_5 DOUBLE
+);
+CREATE TABLE map_user_hover (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    name_id USMALLINT, registered_users BIGINT, app_opens BIGINT
+);
+CREATE TABLE aggregated_transaction (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER, from_ts BIGINT, to_ts BIGINT,
+    category_id USMALLINT, instrument_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE aggregated_insurance (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER, from_ts BIGINT, to_ts BIGINT,
+    category_id USMALLINT, instrument_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE aggregated_user (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    registered_users BIGINT, app_opens BIGINT
+);
+CREATE TABLE aggregated_user_device (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    brand_id USMALLINT, count BIGINT, percentage DOUBLE
+);
+CREATE TABLE top_transaction (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    entity_level VARCHAR, entity_name_id UINTEGER, metric_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE top_insurance (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    entity_level VARCHAR, entity_name_id UINTEGER, metric_type_id USMALLINT, count BIGINT, amount DOUBLE
+);
+CREATE TABLE top_user (
+    file_id INTEGER, scope VARCHAR, parent_state VARCHAR, year INTEGER, quarter INTEGER,
+    entity_level VARCHAR, entity_name_id UINTEGER, registered_users BIGINT
+);
+CREATE TABLE rollup_transaction_category (
+    year INTEGER, quarter INTEGER, category VARCHAR, total_count BIGINT, total_amount DOUBLE
+);
+CREATE TABLE rollup_transaction_region (
+    year INTEGER, quarter INTEGER, name VARCHAR, total_count BIGINT, total_amount DOUBLE
+);
+CREATE TABLE rollup_insurance_period (
+    year INTEGER, quarter INTEGER, total_policies BIGINT, total_premium DOUBLE
+);
+CREATE TABLE rollup_insurance_region (
+    year INTEGER, quarter INTEGER, name VARCHAR, total_policies BIGINT, total_premium DOUBLE
+);
+CREATE TABLE rollup_top_user (
+    year INTEGER, quarter INTEGER, entity_level VARCHAR, entity_name VARCHAR, total_users BIGINT, users_rank INTEGER
+);
+CREATE TABLE rollup_top_transaction (
+    entity_level VARCHAR, entity_name VARCHAR, total_count BIGINT, total_amount DOUBLE, amount_rank INTEGER
+);
+CREATE TABLE rollup_device_brand (
+    year INTEGER, quarter INTEGER, brand VARCHAR, total_users BIGINT
+);
+CREATE TABLE filter_metadata (
+    dataset VARCHAR, kind VARCHAR, parent_state VARCHAR, value VARCHAR, year SMALLINT, quarter TINYINT, row_count BIGINT
+);
+"""
+
+
+PARTITION_COLUMNS = ['scope', 'year']
+
+
+class SnapshotWriter:
+    """Writer for load_sql's loaders that keeps every row in memory until ``write``.
+
+    The ids MySQL would assign to new dim_* dictionary values with
+    AUTO_INCREMENT are assigned here instead.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.rows = {}
+        self.added = 0
+        self.last_ids = {}
+        self.dictionary = load_sql.Dictionary(self.add_value)
+
+    def add(self, table, row):
+        self.append(table, self.dictionary.encode(table, row))
+
+    def append(self, table, row):
+        self.buffers.setdefault(table, []).append(row)
+        self.rows[table] = self.rows.get(table, 0) + 1
+        self.added += 1
+
+    def add_value(self, table, value):
+        # New dictionary value; not counted as a loaded row
+        row_id = self.next_id(table)
+        self.buffers.setdefault(table, []).append((row_id, value))
+        return row_id
+
+    def next_id(self, table):
+        self.last_ids[table] = self.last_ids.get(table, 0) + 1
+        return self.last_ids[table]
+
+    def checkpoint(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, con):
+        for table, rows in self.buffers.items():
+            columns = load_sql.COLUMNS[table]
+            if table in self.last_ids:
+                columns = ('id',) + columns
+            df = pd.DataFrame(rows, columns=list(columns))
+            if 'scope' in columns:
+                df = df.sort_values(PARTITION_COLUMNS + ['quarter'], kind='stable')
+            insert_frame(con, table, df)
+
+
+class SnapshotManifest:
+    """Stand-in for load_sql.Manifest: a snapshot is always built from every file."""
+
+    def __init__(self, source=load_sql.TREE):
+        self.source = source
+        self.skipped = 0
+        self.loaded = 0
+        self.touched = {}
+        self.files = []
+
+    def changed_files(self, base_dir, writer):
+        # Hashed as they are parsed
+        return [(path, stat, None) for path, stat in self.source.files(base_dir)]
+
+    def begin(self, writer, path, dataset, tables):
+        for table in tables:
+            self.touched.setdefault(table, set()).add(load_sql.extract_year_quarter(path))
+        self.files.append([len(self.files) + 1, path, dataset, None, None, None, None])
+        return len(self.files)
+
+    def record(self, writer, path, file_id, stat, digest, row_count):
+        self.files[file_id - 1][3:] = [stat.st_size, stat.st_mtime, digest, row_count]
+        self.loaded += 1
+
+    def write(self, con):
+        columns = ['id', 'path', 'dataset', 'size', 'mtime', 'content_hash', 'row_count']
+        insert_frame(con, 'load_manifest', pd.DataFrame(self.files, columns=columns))
+
+
+def insert_frame(con, table, df):
+    con.register('snapshot_rows', df)
+    try:
+        con.execute(f"INSERT INTO {table} ({', '.join(df.columns)}) SELECT * FROM snapshot_rows")
+    finally:
+        con.unregister('snapshot_rows')
+
+def build_rollups(con, touched):
+    for rollup, source, per_period, select in load_sql.ROLLUPS:
+        if source not in touched:
+            continue
+        # load_sql.ROLLUPS uses MySQL's %s placeholders; DuckDB wants ?
+        select = select.replace('%s', '?')
+        if per_period:
+            for year, quarter in sorted(touched[source]):
+                con.execute(f"INSERT INTO {rollup} {select}", (year, quarter))
+        else:
+            con.execute(f"INSERT INTO {rollup} {select}")
+
+def is_parquet_target(target):
+    return not target.endswith('.duckdb')
+
+def build_snapshot(target, pool=None, stream=False, source=load_sql.TREE, workers=1):
+    """Load every JSON file into ``target``: a ``.duckdb`` file, or a directory of Parquet files."""
+    writer, manifest = SnapshotWriter(), SnapshotManifest(source)
+    load_sql.run_loads(writer, manifest, pool, stream, workers)
+
+    if not is_parquet_target(target) and os.path.exists(target):
+        os.remove(target)
+    con = duckdb.connect(':memory:' if is_parquet_target(target) else target)
+    try:
+        con.execute(SCHEMA)
+        writer.write(con)
+        manifest.write(con)
+        build_rollups(con, manifest.touched)
+        con.execute("INSERT INTO load_generation (id, files_loaded, rows_loaded) VALUES (1, ?, ?)",
+                    (manifest.loaded, writer.added))
+        for select in load_sql.FILTER_METADATA:
+            con.execute(f"INSERT INTO filter_metadata {select}")
+        if is_parquet_target(target):
+            os.makedirs(target, exist_ok=True)
+            for (table,) in con.execute("SELECT table_name FROM information_schema.tables").fetchall():
+                if 'scope' in load_sql.COLUMNS.get(table, ()):
+                    # Snapshots written before partitioning kept these tables in a single file
+                    if os.path.exists(os.path.join(target, table) + '.parquet'):
+                        os.remove(os.path.join(target, table) + '.parquet')
+                    con.execute(f"COPY {table} TO '{os.path.join(target, table)}' "
+                                f"(FORMAT PARQUET, PARTITION_BY ({', '.join(PARTITION_COLUMNS)}), OVERWRITE_OR_IGNORE)")
+                else:
+                    con.execute(f"COPY {table} TO '{os.path.join(target, table)}.parquet' (FORMAT PARQUET)")
+    finally:
+        con.close()
+    print(f"snapshot written to {target}")
+
+def create_snapshot_engine(target, **pool_options):
+    """SQLAlchemy engine over a snapshot, usable wherever the dashboard expects its MySQL engine."""
+    if not is_parquet_target(target):
+        return create_engine(f"duckdb:///{target}", poolclass=QueuePool,
+                             connect_args={'read_only': True}, **pool_options)
+
+    # Every pooled connection is its own in-memory database with views over the Parquet files
+    engine = create_engine("duckdb:///:memory:", poolclass=QueuePool, **pool_options)
+
+    @event.listens_for(engine, 'connect')
+    def attach_parquet(dbapi_connection, connection_record):
+        for file in sorted(os.listdir(target)):
+            path = os.path.join(target, file)
+            if file.endswith('.parquet'):
+                source = f"read_parquet('{path}')"
+                table = file[:-len('.parquet')]
+            elif os.path.isdir(path):
+                # Filters on scope/year only open the matching partition directories
+                source = f"read_parquet('{path}/**/*.parquet', hive_partitioning = true)"
+                table = file
+            else:
+                continue
+            dbapi_connection.execute(f"CREATE VIEW {table} AS SELECT * FROM {source}")
+
+    return engine
@@ -0,0 +1,114 @@
+"""Synthetic PhonePe Pulse data trees at a multiple of the shipped data.
+
+``generate(root, scale)`` writes a copy of the ``aggregated/``, ``map/`` and
+``top/`` trees under ``root`` that is roughly ``scale`` times larger, for
+benchmark.py. The scale is split between time and geography: every file is
+repeated for later years (more quarters), and the district and pincode lists
+of the state-level files are repeated under new names (more districts and
+pincodes). Country-level state lists, categories and the insurance grid keep
+their shape and only gain the extra years. The output is deterministic, so
+the same scale always produces the same tree.
+"""
+import os
+import json
+import math
+import shutil
+
+import load_sql
+
+# Written last into a generated tree; a tree with a matching marker is reused
+MARKER = '.synthetic.json'
+
+
+def scale_factors(scale):
+    """``(time, entities)``: copies of every year, and of every district/pincode list."""
+    time = max(1, round(math.sqrt(scale)))
+    return time, max(1, round(scale / time))
+
+def renamed(name, copy):
+    return f"{name} {copy}"
+
+def repeat_items(items, key, entities):
+    if not items or entities == 1:
+        return items
+    copies = []
+    for copy in range(2, entities + 1):
+        copies.extend(dict(item, **{key: renamed(item[key], copy)}) for item in items)
+    return items + copies
+
+def scale_top(data, entities):
+    body = data.get('data')
+    if isinstance(body, dict):
+        for level in ['districts', 'pincodes']:
+            items = body.get(level) or []
+            key = 'entityName' if items and 'entityName' in items[0] else 'name'
+            body[level] = repeat_items(items, key, entities)
+    return data
+
+def scale_hover(data, entities):
+    body = data['data']
+    if 'hoverDataList' in body:
+        body['hoverDataList'] = repeat_items(body['hoverDataList'], 'name', entities)
+    else:
+        hover = body['hoverData']
+        for copy in range(2, entities + 1):
+            hover.update({renamed(name, copy): values for name, values in list(hover.items())})
+    return data
+
+# Dataset (a load_sql.LOADS base directory) -> how a state-level file gains
+# districts and pincodes; datasets not listed only gain years
+ENTITY_SCALERS = {
+    'top/transaction/country/india': scale_top,
+    'top/insurance/country/india': scale_top,
+    'top/user/country/india': scale_top,
+    'map/transaction/hover/country/india': scale_hover,
+    'map/user/hover/country/india': scale_hover,
+    'map/insurance/hover/country/india': scale_hover,
+}
+
+def year_span(paths):
+    years = [load_sql.extract_year_quarter(path)[0] for path in paths]
+    return max(years) - min(years) + 1
+
+def generate(root, scale, source='.'):
+    """Write the synthetic tree for ``scale`` under ``root``; return its summary."""
+    time, entities = scale_factors(scale)
+    marker = os.path.join(root, MARKER)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            summary = json.load(f)
+        if summary['scale'] == scale:
+            return summary
+        shutil.rmtree(root)
+
+    files, size = 0, 0
+    for _, base_dir in load_sql.LOADS:
+        paths = sorted(load_sql.iter_json_files(os.path.join(source, base_dir)))
+        if not paths:
+            continue
+        span = year_span(paths)
+        scaler = ENTITY_SCALERS.get(base_dir)
+        for path in paths:
+            relative = os.path.relpath(path, source)
+            parts = relative.split(os.sep)
+            year = int(parts[-2])
+            data = None
+            if scaler and entities > 1 and load_sql.extract_geography(relative)[0] == 'state':
+                with open(path) as f:
+                    data = scaler(json.load(f), entities)
+            for copy in range(time):
+                parts[-2] = str(year + copy * span)
+                target = os.path.join(root, *parts)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if data is None:
+                    shutil.copyfile(path, target)
+                else:
+                    with open(target, 'w') as f:
+                        json.dump(data, f, separators=(',', ':'))
+                files += 1
+                size += os.path.getsize(target)
+
+    summary = {'scale': scale, 'time_factor': time, 'entity_factor': entities, 'files': files, 'bytes': size}
+    with open(marker, 'w') as f:
+        json.dump(summary, f)
+    return summary